@@ -10,10 +10,12 @@ set_bot_commands, main.
 
 import re
 import random
+import asyncio
 from datetime import datetime, time
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     ApplicationHandlerStop,
     CommandHandler,
@@ -27,7 +29,7 @@ from telegram.ext import (
 
 from config import (
     TELEGRAM_TOKEN, ALLOWED_USER_IDS, TZ, logger, OWNER_CHAT_ID,
-    ZONE_EMOJI, PROJECT_EMOJI, ALL_DESTINATIONS,
+    ALL_DESTINATIONS,
     JOY_CATEGORIES, JOY_CATEGORY_EMOJI, REMINDERS,
     READING_GROUP_ID, READING_TOPIC_ID, READING_STATE_FILE,
     BOOK_TRIAGE_STATE_FILE,
@@ -37,7 +39,7 @@ from storage import get_week_events, load_morning_cache
 from tasks import (
     get_life_tasks, add_task_to_zone, complete_task,
     suggest_zone_for_task, create_rawnote,
-    _task_hash, _parse_sensory_menu,
+    _task_hash, _PRIO_STRIP, _parse_sensory_menu, get_joy_items,
     _format_sensory_menu_for_prompt, _sensory_hardcoded_response,
     check_task_deadlines, clear_today_section,
     today_morning_prompt, today_evening_review,
@@ -51,8 +53,8 @@ from keyboards import (
     get_main_keyboard, get_reply_keyboard,
     get_note_mode_keyboard,
     get_joy_keyboard, get_joy_items_keyboard,
-    get_task_confirm_keyboard, get_destination_keyboard,
-    get_sensory_bad_keyboard, BINGO_ITEMS,
+    get_task_confirm_keyboard, get_destination_keyboard, get_priority_keyboard,
+    get_sensory_bad_keyboard, get_save_zone_keyboard, BINGO_ITEMS,
 )
 from handlers import (
     start, switch_to_geek,
@@ -68,7 +70,7 @@ from handlers import (
     myid_command,
     check_reminders,
     sleep_reminder_job, whoop_morning_recovery, whoop_evening_update,
-    whoop_morning_data_write,
+    whoop_morning_data_write, _SAVE_RE,
     monday_review, get_morning_whoop_data,
     send_scheduled_reminder, send_finance_csv_reminder,
     handle_voice, handle_photo_note, handle_message, handle_remind_callback,
@@ -174,7 +176,6 @@ async def _send_urgent_to_reading(book_path: str, book_info: dict, context):
     """Urgent: push the item into Читалка now. Articles are translated (if English) and
     posted immediately as a .md doc; books are too large to inline, so they stay in the
     morning-reading queue and get a heads-up instead."""
-    import asyncio
     from pathlib import Path
     from storage import get_writing_file
 
@@ -456,17 +457,14 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
                     # If digest/teach — launch background generation
                     if action == "digest":
-                        import asyncio
                         asyncio.create_task(
                             _generate_book_digest(book_path, book_info, context)
                         )
                     elif action == "teach":
-                        import asyncio
                         asyncio.create_task(
                             _queue_book_course(book_path, book_info, context)
                         )
                     elif action == "urgent":
-                        import asyncio
                         asyncio.create_task(
                             _send_urgent_to_reading(book_path, book_info, context)
                         )
@@ -667,19 +665,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             return
 
         if pending["type"] == "task":
-            keyboard = [
-                [
-                    InlineKeyboardButton("Срочное ⏫", callback_data="savepri_high"),
-                    InlineKeyboardButton("Обычное 🔼", callback_data="savepri_medium"),
-                ],
-                [
-                    InlineKeyboardButton("Не срочное 🔽", callback_data="savepri_low"),
-                    InlineKeyboardButton("Без приоритета", callback_data="savepri_none"),
-                ],
-            ]
             await query.edit_message_text(
                 f"Задача: {pending['content']}\nЗона: {pending['zone_or_title']}\n\nВыбери приоритет:",
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                reply_markup=get_priority_keyboard("savepri_")
             )
         else:  # note
             success = create_rawnote(pending["zone_or_title"], pending["content"])
@@ -725,27 +713,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await query.edit_message_text("Нечего сохранять.")
             return
 
-        keyboard = []
-        zones = list(ZONE_EMOJI.items())
-        for i in range(0, len(zones), 2):
-            row = []
-            for name, emoji in zones[i:i+2]:
-                row.append(InlineKeyboardButton(f"{emoji} {name.capitalize()}", callback_data=f"zone_{name}"))
-            keyboard.append(row)
-
-        projects = list(PROJECT_EMOJI.items())
-        for i in range(0, len(projects), 2):
-            row = []
-            for name, emoji in projects[i:i+2]:
-                short = name.replace("-", " ").capitalize()
-                row.append(InlineKeyboardButton(f"{emoji} {short}", callback_data=f"zone_{name}"))
-            keyboard.append(row)
-
-        keyboard.append([InlineKeyboardButton("Отмена", callback_data="save_cancel")])
-
         await query.edit_message_text(
             f"Задача: {pending['content']}\n\nВыбери зону или проект:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=get_save_zone_keyboard()
         )
 
     elif data.startswith("zone_"):
@@ -756,19 +726,9 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             return
 
         pending["zone_or_title"] = zone
-        keyboard = [
-            [
-                InlineKeyboardButton("Срочное ⏫", callback_data="savepri_high"),
-                InlineKeyboardButton("Обычное 🔼", callback_data="savepri_medium"),
-            ],
-            [
-                InlineKeyboardButton("Не срочное 🔽", callback_data="savepri_low"),
-                InlineKeyboardButton("Без приоритета", callback_data="savepri_none"),
-            ],
-        ]
         await query.edit_message_text(
             f"Задача: {pending['content']}\nЗона: {zone}\n\nВыбери приоритет:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=get_priority_keyboard("savepri_")
         )
 
     # ── Sensory Bad (bingo checklist) ──
@@ -876,17 +836,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             category = action.replace("cat_", "")
             if category in JOY_CATEGORIES:
                 emoji = JOY_CATEGORY_EMOJI.get(category, "✨")
-                menu = _parse_sensory_menu()
-                category_map = {
-                    "sensory": ["inputs", "emergency", "unfreeze"],
-                    "creativity": ["creativity"],
-                    "media": ["media"],
-                    "connection": ["connection"]
-                }
-                items = []
-                for key in category_map.get(category, []):
-                    items.extend(menu.get(key, []))
-                _joy_items_cache[category] = items
+                _joy_items_cache[category] = get_joy_items(category)
 
                 await query.edit_message_text(
                     f"{emoji} **{category.capitalize()}**\n\nЧто именно?",
@@ -1048,7 +998,7 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 logger.info("Loaded morning WHOOP data from file cache")
             else:
                 try:
-                    morning_data = get_morning_whoop_data()
+                    morning_data = await asyncio.to_thread(get_morning_whoop_data)
                     logger.info("Re-fetched morning WHOOP data from API")
                 except Exception as e:
                     logger.error(f"Failed to re-fetch morning data: {e}")
@@ -1108,13 +1058,13 @@ Human ответила "как себя чувствуешь?": "{feeling_text}"
 Без эмодзи. На русском. 5-8 предложений."""
 
         text = await get_llm_response(prompt, mode="geek", max_tokens=1200, skip_context=True, custom_system=WHOOP_HEALTH_SYSTEM, use_pro=True)
-        text = re.sub(r'\[SAVE:[^\]]+\]', '', text).strip()
+        text = _SAVE_RE.sub('', text).strip()
 
         # Retry once if response suspiciously short (Gemini Pro sometimes returns fragments)
         if len(text) < 200:
             logger.warning(f"WHOOP morning response too short ({len(text)} chars), retrying...")
             text = await get_llm_response(prompt, mode="geek", max_tokens=1200, skip_context=True, custom_system=WHOOP_HEALTH_SYSTEM, use_pro=True)
-            text = re.sub(r'\[SAVE:[^\]]+\]', '', text).strip()
+            text = _SAVE_RE.sub('', text).strip()
 
         # Remove buttons from original message, keep data
         await query.edit_message_reply_markup(reply_markup=None)
@@ -1248,13 +1198,14 @@ Human ответила "как себя чувствуешь?": "{feeling_text}"
             return
 
         if complete_task(task_text):
+            task_map.pop(task_hash, None)
             old_markup = query.message.reply_markup
             if old_markup:
                 new_buttons = [
                     row for row in old_markup.inline_keyboard
                     if not any(btn.callback_data == data for btn in row)
                 ]
-                display = task_text.replace("⏫", "").replace("🔺", "").replace("🔼", "").strip()
+                display = task_text.translate(_PRIO_STRIP).strip()
                 old_text = query.message.text
                 for line in old_text.split("\n"):
                     clean_line = line.lstrip("0123456789. ")
@@ -1400,7 +1351,14 @@ async def handle_reading_reaction(update: Update, context: ContextTypes.DEFAULT_
 
 def main() -> None:
     """Запуск бота."""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    # Rate limiter: рассылки из jobs не упираются в лимит Telegram (~30 msg/s),
+    # RetryAfter отрабатывается повтором внутри PTB
+    application = (
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .rate_limiter(AIORateLimiter(overall_max_rate=25, max_retries=3))
+        .build()
+    )
     application.post_init = set_bot_commands
 
     # Проверка доступа — блокирует всех кроме разрешённых user_id
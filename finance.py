@@ -7,7 +7,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from config import TZ, logger, WRITING_REPO
 from storage import get_writing_file, save_writing_file
-from finance_processor import process_period
+from finance_processor import process_period, process_periods
 
 
 def detect_csv_type(filename: str, content: str = "") -> str | None:
@@ -103,23 +103,31 @@ async def handle_csv_upload(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 
 async def process_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Команда /process [YYYY-MM] — обработать raw CSV в processed."""
+    """Команда /process [YYYY-MM ...] — обработать raw CSV в processed."""
     now = datetime.now(TZ)
 
     if context.args:
-        period = context.args[0]
+        periods = context.args
     else:
-        period = now.strftime("%Y-%m")
+        periods = [now.strftime("%Y-%m")]
 
     # Валидация формата
-    if not (len(period) == 7 and period[4] == "-") and not (len(period) == 4 and period.isdigit()):
-        await update.message.reply_text("Формат: /process YYYY-MM или /process YYYY\nПример: /process 2026-02")
-        return
+    for period in periods:
+        if not (len(period) == 7 and period[4] == "-") and not (len(period) == 4 and period.isdigit()):
+            await update.message.reply_text(
+                "Формат: /process YYYY-MM или /process YYYY\n"
+                "Пример: /process 2026-02 или /process 2026-01 2026-02"
+            )
+            return
 
-    await update.message.reply_text(f"Обрабатываю {period}...")
+    await update.message.reply_text(f"Обрабатываю {', '.join(periods)}...")
 
     try:
-        result = await asyncio.to_thread(process_period, period)
+        if len(periods) == 1:
+            result = await asyncio.to_thread(process_period, periods[0])
+        else:
+            # Курсы и категории загружаются один раз на все периоды
+            result = await asyncio.to_thread(process_periods, periods)
         await update.message.reply_text(result)
     except Exception as e:
         logger.error(f"Process command error: {e}", exc_info=True)
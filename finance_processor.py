@@ -4,8 +4,13 @@
 """
 
 import io
+import re
 import csv
 import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
 from pathlib import Path
 
 from config import logger
@@ -14,11 +19,14 @@ from process import (
     parse_zen, parse_paypal, parse_credo_sms, parse_wolt,
     fetch_floatrates, set_rates, load_categories,
     generate_monthly_summary, generate_yearly_summary,
-    CSV_FIELDS, FALLBACK_RATES,
+    CSV_FIELDS, FALLBACK_RATES, _ZEN_DATE_RE,
 )
 
 CATEGORIES_FILE = Path(__file__).parent / "categories.json"
 
+# Wolt в описании Credo SMS (любой регистр, без аллокации .lower() на строку)
+_WOLT_RE = re.compile(r'wolt', re.IGNORECASE)
+
 
 def _load_local_categories():
     """Загрузить categories.json из бандла в репо."""
@@ -28,40 +36,41 @@ def _load_local_categories():
 
 def _download_raw_files(year: str) -> dict:
     """Скачать raw CSV из GitHub, вернуть {source_type: content_string}."""
-    import re
-
     dir_path = f"finance/raw/{year}"
     files = list_writing_dir(dir_path)
     if not files:
         return {}
 
     # Сортируем файлы по типу
-    zen_candidates = {}  # name -> path
-    paypal_files = {}
-    credo_sms = {}
-    wolt_files = {}
-
+    zen_candidates = []  # (name, path)
+    paypal_files = []
+    credo_sms = []
+    wolt_files = []
+
+    routes = (
+        (("zen",), zen_candidates),
+        (("pp", "paypal", "download"), paypal_files),
+        (("credo_sms",), credo_sms),
+        (("wolt",), wolt_files),
+    )
     for name, path in files.items():
         lower = name.lower()
-        if lower.startswith("zen") and lower.endswith(".csv"):
-            zen_candidates[name] = path
-        elif (lower.startswith("pp") or lower.startswith("paypal") or lower.startswith("download")) and lower.endswith(".csv"):
-            paypal_files[name] = path
-        elif lower.startswith("credo_sms") and lower.endswith(".csv"):
-            credo_sms[name] = path
-        elif lower.startswith("wolt") and lower.endswith(".csv"):
-            wolt_files[name] = path
+        if not lower.endswith(".csv"):
+            continue
+        for prefixes, bucket in routes:
+            if lower.startswith(prefixes):
+                bucket.append((name, path))
+                break
 
     raw = {}
 
     # Zen Money: только последний файл (каждый экспорт — полный дамп)
     if zen_candidates:
         def _zen_sort_key(name):
-            m = re.search(r'zen_(\d{4}-\d{2}-\d{2})', name)
+            m = _ZEN_DATE_RE.search(name)
             return (1, m.group(1)) if m else (0, name)
 
-        latest_name = sorted(zen_candidates.keys(), key=_zen_sort_key)[-1]
-        latest_path = zen_candidates[latest_name]
+        latest_name, latest_path = sorted(zen_candidates, key=lambda t: _zen_sort_key(t[0]))[-1]
         content = get_writing_file(latest_path)
         if content:
             raw["zen"] = content
@@ -72,8 +81,8 @@ def _download_raw_files(year: str) -> dict:
 
     # Credo SMS: один файл (последний если несколько)
     if credo_sms:
-        latest_name = sorted(credo_sms.keys())[-1]
-        content = get_writing_file(credo_sms[latest_name])
+        latest_name, latest_path = sorted(credo_sms)[-1]
+        content = get_writing_file(latest_path)
         if content:
             raw["credo_sms"] = content
             logger.info(f"Downloaded credo_sms: {latest_name} ({len(content)} bytes)")
@@ -81,8 +90,8 @@ def _download_raw_files(year: str) -> dict:
     # PayPal: все файлы (дедупликация по transaction ID в парсере)
     if paypal_files:
         pp_list = []
-        for name in sorted(paypal_files.keys()):
-            content = get_writing_file(paypal_files[name])
+        for name, path in sorted(paypal_files):
+            content = get_writing_file(path)
             if content:
                 pp_list.append(content)
                 logger.info(f"Downloaded paypal: {name} ({len(content)} bytes)")
@@ -92,8 +101,8 @@ def _download_raw_files(year: str) -> dict:
     # Wolt: все файлы
     if wolt_files:
         wolt_list = []
-        for name in sorted(wolt_files.keys()):
-            content = get_writing_file(wolt_files[name])
+        for name, path in sorted(wolt_files):
+            content = get_writing_file(path)
             if content:
                 wolt_list.append(content)
                 logger.info(f"Downloaded wolt: {name} ({len(content)} bytes)")
@@ -104,18 +113,40 @@ def _download_raw_files(year: str) -> dict:
 
 
 def _serialize_csv(rows: list) -> str:
-    """Сериализовать список строк в CSV-строку."""
-    rows_sorted = sorted(rows, key=lambda x: x["date"])
+    """Сериализовать список строк (уже отсортированный по дате) в CSV-строку."""
     output = io.StringIO()
     writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
     writer.writeheader()
-    writer.writerows(rows_sorted)
+    writer.writerows(rows)
     return output.getvalue()
 
 
-def process_period(period: str) -> str:
+def _prepare_context() -> tuple:
+    """Загрузить курсы валют (и выставить их в process.py) и категории."""
+    rates = fetch_floatrates()
+    if not rates:
+        rates = FALLBACK_RATES
+        logger.warning("Using fallback exchange rates")
+    set_rates(rates)
+
+    # Категории (из бандла)
+    categories = _load_local_categories()
+    return rates, categories
+
+
+def process_periods(periods: list[str]) -> str:
+    """
+    Обработать несколько периодов подряд.
+    Курсы и категории загружаются один раз на весь батч.
+    """
+    context = _prepare_context()
+    return "\n\n".join(process_period(period, context) for period in periods)
+
+
+def process_period(period: str, context: tuple | None = None) -> str:
     """
     Обработать период (YYYY-MM или YYYY).
+    context — (rates, categories) из _prepare_context(); если не передан, загружается заново.
     Возвращает текстовый отчёт для Telegram.
     """
     # Определяем год и тип
@@ -128,15 +159,10 @@ def process_period(period: str) -> str:
     else:
         return f"Неверный формат: {period}. Используй YYYY-MM или YYYY."
 
-    # Курсы валют
-    rates = fetch_floatrates()
-    if not rates:
-        rates = FALLBACK_RATES
-        logger.warning("Using fallback exchange rates")
-    set_rates(rates)
-
-    # Категории (из бандла)
-    categories = _load_local_categories()
+    # Курсы валют и категории
+    if context is None:
+        context = _prepare_context()
+    _, categories = context
 
     # Скачиваем raw файлы
     raw_files = _download_raw_files(year)
@@ -146,48 +172,48 @@ def process_period(period: str) -> str:
     sources_found = ", ".join(raw_files.keys())
     logger.info(f"Processing {period}: sources={sources_found}")
 
-    # Парсим — порядок важен для дедупликации
-    all_rows = []
+    # Парсим — порядок важен для дедупликации.
+    # Каждый источник собирается в свой список, all_rows склеивается один раз в конце.
     stats = []
-    has_credo_sms = False
+    credo_rows = []
+    wolt_all = []
+    zen_rows = []
+    pp_all = []
 
     # Порядок: Credo SMS → Wolt (заменяет Wolt-строки из Credo) → Zen → PayPal
     if "credo_sms" in raw_files:
         credo_rows = parse_credo_sms(
             io.StringIO(raw_files["credo_sms"]), categories, period,
         )
-        has_credo_sms = len(credo_rows) > 0
         stats.append(f"Credo SMS: {len(credo_rows)}")
-        all_rows.extend(credo_rows)
+    has_credo_sms = len(credo_rows) > 0
 
     if "wolt_files" in raw_files:
-        wolt_all = []
         for wolt_content in raw_files["wolt_files"]:
-            wolt_rows = parse_wolt(io.StringIO(wolt_content), categories, period)
-            wolt_all.extend(wolt_rows)
+            wolt_all.extend(parse_wolt(io.StringIO(wolt_content), categories, period))
         if wolt_all:
             # Удаляем Wolt-строки из Credo SMS — Wolt CSV точнее
-            before = len(all_rows)
-            all_rows = [
-                r for r in all_rows
-                if not (r["source"] == "credo_sms" and "wolt" in r["description"].lower())
-            ]
-            wolt_deduped = before - len(all_rows)
-            stats.append(f"Wolt: {len(wolt_all)} (убрано {wolt_deduped} из Credo SMS)")
-            all_rows.extend(wolt_all)
+            keep = []
+            removed = 0
+            for r in credo_rows:
+                if _WOLT_RE.search(r["description"]):
+                    removed += 1
+                    continue
+                keep.append(r)
+            credo_rows = keep
+            stats.append(f"Wolt: {len(wolt_all)} (убрано {removed} из Credo SMS)")
 
     if "zen" in raw_files:
         zen_rows = parse_zen(
             io.StringIO(raw_files["zen"]), categories, period,
         )
         if has_credo_sms:
+            # GEL-операции берём из Credo SMS
             zen_rows = [r for r in zen_rows if r["currency"] != "GEL" or r["type"] == "transfer"]
         stats.append(f"Zen Money: {len(zen_rows)}")
-        all_rows.extend(zen_rows)
 
     if "paypal_files" in raw_files:
         seen_tx_ids = set()
-        pp_all = []
         for pp_content in raw_files["paypal_files"]:
             pp_rows = parse_paypal(io.StringIO(pp_content), categories, period)
             for r in pp_rows:
@@ -198,54 +224,81 @@ def process_period(period: str) -> str:
                     seen_tx_ids.add(tx_id)
                 pp_all.append(r)
         stats.append(f"PayPal: {len(pp_all)} ({len(raw_files['paypal_files'])} файлов)")
-        all_rows.extend(pp_all)
+
+    all_rows = list(chain.from_iterable(
+        rows for rows in (credo_rows, wolt_all, zen_rows, pp_all) if rows
+    ))
 
     if not all_rows:
         return f"Нет транзакций за {period}."
 
-    # Статистика
-    income_total = sum(r["amount_rub"] for r in all_rows if r["type"] == "income")
-    expense_total = sum(r["amount_rub"] for r in all_rows if r["type"] == "expense")
-    transfer_count = sum(1 for r in all_rows if r["type"] == "transfer")
-
-    # Сериализуем основной CSV
+    # Сортируем один раз — дальше CSV и summary работают с упорядоченным списком
+    all_rows.sort(key=itemgetter("date"))
+
+    # Статистика — один проход: слагаемые сумм, переводы и счётчики нераспознанных.
+    # Суммы — math.fsum, как и в summary, чтобы отчёт сходился с ними
+    incomes = []
+    expenses = []
+    transfer_count = 0
+    unknown_exp = 0
+    unknown_inc = 0
+    for r in all_rows:
+        tx_type = r["type"]
+        if tx_type == "income":
+            incomes.append(r["amount_rub"])
+            if r["category"] == "other_income":
+                unknown_inc += 1
+        elif tx_type == "expense":
+            expenses.append(r["amount_rub"])
+            if r["category"] == "other_expense":
+                unknown_exp += 1
+        elif tx_type == "transfer":
+            transfer_count += 1
+    income_total = math.fsum(incomes)
+    expense_total = math.fsum(expenses)
+
+    # Сериализуем основной CSV и коммитим его в фоне, пока считается summary.
+    # Один воркер: коммиты в одну ветку идут строго по очереди (иначе 409 от GitHub).
     csv_content = _serialize_csv(all_rows)
     csv_path = f"finance/processed/{period}.csv"
-    save_writing_file(csv_path, csv_content, f"Process {period}: {len(all_rows)} transactions")
-
-    # Генерируем summary
-    if is_year:
-        summary = generate_yearly_summary(all_rows, year, categories)
-    else:
-        summary = generate_monthly_summary(all_rows, period, categories)
     summary_path = f"finance/summaries/{period}.md"
-    save_writing_file(summary_path, summary, f"Summary {period}")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        csv_future = executor.submit(
+            save_writing_file, csv_path, csv_content,
+            f"Process {period}: {len(all_rows)} transactions",
+        )
+
+        # Генерируем summary
+        if is_year:
+            summary = generate_yearly_summary(all_rows, year, categories)
+        else:
+            summary = generate_monthly_summary(all_rows, period, categories)
+        summary_future = executor.submit(save_writing_file, summary_path, summary, f"Summary {period}")
 
-    # Нераспознанные
-    unknown_exp = [r for r in all_rows if r["category"] == "other_expense" and r["type"] == "expense"]
-    unknown_inc = [r for r in all_rows if r["category"] == "other_income" and r["type"] == "income"]
+        csv_future.result()
+        summary_future.result()
 
     # Формируем отчёт для Telegram
-    lines = [f"✓ Обработано {period}:"]
-    lines.append("")
-    for s in stats:
-        lines.append(f"  {s}")
-    lines.append(f"  Всего: {len(all_rows)}")
-    lines.append("")
-    lines.append(f"Доходы: {income_total:,.0f} R")
-    lines.append(f"Расходы: {expense_total:,.0f} R")
-    lines.append(f"Баланс: {income_total - expense_total:+,.0f} R")
+    lines = [
+        f"✓ Обработано {period}:",
+        "",
+        *[f"  {s}" for s in stats],
+        f"  Всего: {len(all_rows)}",
+        "",
+        f"Доходы: {income_total:,.0f} R",
+        f"Расходы: {expense_total:,.0f} R",
+        f"Баланс: {income_total - expense_total:+,.0f} R",
+    ]
     if transfer_count:
         lines.append(f"Переводы: {transfer_count}")
 
     if unknown_exp or unknown_inc:
         lines.append("")
         if unknown_exp:
-            lines.append(f"Нераспознанные расходы: {len(unknown_exp)}")
+            lines.append(f"Нераспознанные расходы: {unknown_exp}")
         if unknown_inc:
-            lines.append(f"Нераспознанные доходы: {len(unknown_inc)}")
+            lines.append(f"Нераспознанные доходы: {unknown_inc}")
 
-    lines.append("")
-    lines.append(f"Файлы: {csv_path}, {summary_path}")
+    lines += ["", f"Файлы: {csv_path}, {summary_path}"]
 
     return "\n".join(lines)
@@ -6,13 +6,20 @@ Imports domain logic from tasks, joy, llm, keyboards, finance, storage modules.
 """
 
 import re
+import html
 import random
+import asyncio
+from collections import Counter, OrderedDict
 from datetime import datetime, time, timedelta
+from functools import lru_cache, partial
+from operator import itemgetter
+from time import monotonic
 
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup,
     ReplyKeyboardMarkup, KeyboardButton,
 )
+from telegram.error import BadRequest, NetworkError, TimedOut
 from telegram.ext import ContextTypes
 
 from config import (
@@ -23,17 +30,17 @@ from config import (
     REMINDERS, FAMILY_ALIASES,
 )
 from prompts import (
-    SENSORY_INDRA_PROMPT, WHOOP_HEALTH_SYSTEM,
+    SENSORY_INDRA_PROMPT, WHOOP_HEALTH_SYSTEM, WHOOP_COMMAND_INSTRUCTIONS,
     INDRA_WHOOP_DAILY_PROMPT,
     CAPTAIN_PROMPT, CAPTAIN_REPLY_PROMPT,
     MORNING_SHARED_CONTEXT, INDRA_MORNING_INSPIRATION,
     MAKS_MORNING_INSPIRATION, KSENIA_MORNING_INSPIRATION,
 )
 from storage import (
-    load_file, get_writing_file, save_writing_file,
+    load_file_cached, get_writing_file, save_writing_file,
     get_week_events, register_family_member, get_family_chat_id,
     add_reminder, get_due_reminders, parse_remind_time,
-    get_reminders, is_muted, save_morning_cache,
+    get_reminders, reminder_timestamp, is_muted, save_morning_cache,
     load_whoop_patterns, load_whoop_baselines,
     load_latest_indra_session,
     load_food_log, save_food_log, load_kitchen_dishes, update_food_log_md,
@@ -41,9 +48,9 @@ from storage import (
 from tasks import (
     get_life_tasks, add_task_to_zone, complete_task,
     suggest_zone_for_task, create_rawnote, parse_save_tag,
-    _task_hash, _get_priority_tasks, _parse_sensory_menu,
+    _task_hash, _PRIO_STRIP, _get_priority_tasks, _parse_sensory_menu,
     _get_random_sensory_suggestion, _format_sensory_menu_for_prompt,
-    _sensory_hardcoded_response, check_task_deadlines, get_today_tasks,
+    _sensory_hardcoded_response, check_task_deadlines, _parse_today_tasks,
 )
 from joy import get_joy_stats_week, log_joy, _joy_items_cache
 from llm import (
@@ -56,11 +63,11 @@ from keyboards import (
     get_note_mode_keyboard, get_sensory_keyboard,
     get_joy_keyboard, get_joy_items_keyboard,
     get_task_confirm_keyboard, get_destination_keyboard,
-    get_priority_keyboard,
+    get_priority_keyboard, get_reminder_recurrence_keyboard, whoop_morning_keyboard,
     food_confirm_keyboard, food_is_food_keyboard,
 )
 from finance import handle_csv_upload, income_command, process_command  # noqa: F401 — re-exported for bot.py
-from whoop import whoop_client
+from whoop import whoop_client, compute_recovery_summary
 from meal_data import generate_weekly_menu
 from food import (
     recognize_food, match_custom_dish, match_kitchen_dish,
@@ -69,6 +76,26 @@ from food import (
     is_edit_command, parse_edit_command, apply_edit_op, _log_date,
 )
 
+# Строка списка задач: маркер ("- ", "* ", "• ") и/или номер ("1. ", "1) ") → текст задачи.
+# Lookahead отсекает строки из одного маркера/номера ("-", "1.", "2)"): без него
+# бэктрекинг отдал бы сам маркер в группу как текст задачи
+_BULLET_RE = re.compile(r'^[\s\-*•]*(?:\d+[.)]\s*)?(?![\s\-*•]*(?:\d+[.)])?\s*$)(.*\S)\s*$')
+# SAVE-теги из ответа LLM — вырезаем перед отправкой
+_SAVE_RE = re.compile(r'\[SAVE:[^\]]+\]')
+# Секция WHOOP в life/health/здоровье.md
+_WHOOP_SECTION_RE = re.compile(r'## Трекинг \(WHOOP\).*?(?=\n## |\n---|\Z)', re.DOTALL)
+# Сколько напоминаний check_reminders отправляет одновременно
+_REMINDER_SEND_LIMIT = 25
+# Категории joy с эмодзи — порядок и пары не меняются за время жизни процесса
+_CAT_EMOJI = tuple((cat, JOY_CATEGORY_EMOJI.get(cat, "")) for cat in JOY_CATEGORIES)
+# Сколько hash → task_text держать для кнопок Done из /dashboard
+_TASK_DONE_MAP_MAX = 500
+# Последний ответ /whoop: тот же набор данных в пределах TTL → без повторного вызова LLM
+_WHOOP_REPLY_TTL = 1800  # seconds
+_whoop_reply_cache = {"key": None, "ts": 0, "text": None}
+# System для /whoop: статичный префикс (персона + инструкции), одинаковый для всех вызовов
+_WHOOP_COMMAND_SYSTEM = WHOOP_HEALTH_SYSTEM + WHOOP_COMMAND_INSTRUCTIONS
+
 
 # ── Command handlers ─────────────────────────────────────────────────────────
 
@@ -105,19 +132,36 @@ async def switch_to_geek(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 
+# TTL-кэш контекста для LLM-промптов (календарь, WHOOP, приоритетные задачи)
+_CONTEXT_CACHE_TTL = 120  # seconds
+_context_cache = {}  # fn.__name__ -> (monotonic ts, value)
+
+
+def _cached_context(fn):
+    """Вызвать fn() или вернуть её результат, если он моложе _CONTEXT_CACHE_TTL."""
+    now = monotonic()
+    hit = _context_cache.get(fn.__name__)
+    if hit and now - hit[0] < _CONTEXT_CACHE_TTL:
+        return hit[1]
+    value = fn()
+    _context_cache[fn.__name__] = (now, value)
+    return value
+
+
 async def captain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /captain — обзор дел и планов голосом Кэп."""
     chat_id = update.effective_chat.id
 
-    # Собираем данные
-    tasks_content = get_life_tasks()
-    calendar = get_week_events()
-    whoop = _get_whoop_context()
+    # Собираем данные: три независимых блокирующих источника — параллельно,
+    # через короткий TTL-кэш (между вызовами /captain они почти не меняются).
+    # tasks сокращаем — берём только открытые с приоритетами.
+    calendar, whoop, priority_tasks = await asyncio.gather(
+        asyncio.to_thread(_cached_context, get_week_events),
+        asyncio.to_thread(_cached_context, _get_whoop_context),
+        asyncio.to_thread(_cached_context, _get_priority_tasks),
+    )
     current_time = datetime.now(TZ).strftime("%Y-%m-%d %H:%M, %A")
 
-    # Сокращаем tasks — берём только открытые с приоритетами
-    priority_tasks = _get_priority_tasks()
-
     captain_system = CAPTAIN_PROMPT.format(
         tasks_context=priority_tasks,
         calendar_context=calendar,
@@ -142,40 +186,64 @@ async def captain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.info(f"Captain message sent, msg_id={sent.message_id}")
 
 
-async def dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Команда /dashboard — быстрый обзор: Сегодня + горит + на этой неделе, с кнопками Done."""
-    tasks_content = get_life_tasks()
-    now = datetime.now(TZ)
-    end_of_week = now + timedelta(days=(6 - now.weekday()))  # Воскресенье
-    end_date = end_of_week.strftime("%Y-%m-%d")
+# Открытая задача "- [ ] ..." за один проход по всему tasks.md:
+# group(1) — первая дата 📅 YYYY-MM-DD в строке (или None), group(2) — текст задачи.
+_OPEN_TASK_RE = re.compile(
+    r'^[ \t]*- \[ \] ?'
+    r'(?=(?:[^\n]*?📅[^\S\n]*(\d{4}-\d{2}-\d{2}))?)'
+    r'([^\n]*?)[ \t\r]*$',
+    re.MULTILINE,
+)
+
+
+@lru_cache(maxsize=4)
+def _parse_dashboard(tasks_content: str, end_date: str) -> tuple:
+    """Разобрать tasks.md для /dashboard → (today, high_priority, due_this_week).
 
-    lines = tasks_content.split("\n")
-    today_tasks = get_today_tasks()
+    Кэшируется по содержимому: get_life_tasks() отдаёт один и тот же объект
+    строки, пока жив её TTL-кэш, так что повторные /dashboard не парсят заново.
+    """
+    today_tasks = _parse_today_tasks(tasks_content)
+    today_set = {t.strip() for t in today_tasks}
     high_priority = []
     due_this_week = []
 
-    for line in lines:
-        stripped = line.strip()
-        if not stripped.startswith("- [ ]"):
-            continue
-        task_text = stripped[6:]
+    for m in _OPEN_TASK_RE.finditer(tasks_content):
+        due_date, task_text = m.groups()
 
         # Skip tasks already in today_tasks (avoid duplicates)
-        if task_text.strip() in [t.strip() for t in today_tasks]:
+        if task_text.strip() in today_set:
             continue
 
         has_high = "⏫" in task_text or "🔺" in task_text
-        due_match = re.search(r'📅\s*(\d{4}-\d{2}-\d{2})', task_text)
 
-        if has_high and not due_match:
+        if has_high and not due_date:
             high_priority.append(task_text)
-        elif due_match:
-            due_date = due_match.group(1)
+        elif due_date:
             if due_date <= end_date:
                 due_this_week.append(task_text)
             elif has_high:
                 high_priority.append(task_text)
 
+    return tuple(today_tasks), tuple(high_priority), tuple(due_this_week)
+
+
+def _dashboard_row(num: int, task: str, task_hash: str) -> tuple:
+    """Строка сообщения и ряд кнопок Done для одной задачи /dashboard."""
+    display = task.translate(_PRIO_STRIP).strip()
+    short = display if len(display) <= 30 else display[:30] + "..."
+    return f"{num}. {display}", [InlineKeyboardButton(f"✅ {num}. {short}", callback_data=f"done_{task_hash}")]
+
+
+async def dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Команда /dashboard — быстрый обзор: Сегодня + горит + на этой неделе, с кнопками Done."""
+    tasks_content = await asyncio.to_thread(get_life_tasks)
+    now = datetime.now(TZ)
+    end_of_week = now + timedelta(days=(6 - now.weekday()))  # Воскресенье
+    end_date = end_of_week.strftime("%Y-%m-%d")
+
+    today_tasks, high_priority, due_this_week = _parse_dashboard(tasks_content, end_date)
+
     # Собираем все задачи для кнопок (Сегодня первыми)
     all_tasks = today_tasks + high_priority + due_this_week
     if not all_tasks:
@@ -183,47 +251,32 @@ async def dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
 
     # Сохраняем маппинг hash -> task_text для callback
-    task_map = context.bot_data.setdefault("task_done_map", {})
-    for t in all_tasks:
-        task_map[_task_hash(t)] = t
-
-    # Формируем сообщение с нумерацией
+    # LRU: свежие задачи в конец, самые старые вытесняются сверх _TASK_DONE_MAP_MAX
+    task_map = context.bot_data.setdefault("task_done_map", OrderedDict())
+    hashes = [_task_hash(t) for t in all_tasks]
+    for h, t in zip(hashes, all_tasks):
+        task_map[h] = t
+        task_map.move_to_end(h)
+    while len(task_map) > _TASK_DONE_MAP_MAX:
+        task_map.popitem(last=False)
+
+    # Формируем сообщение с нумерацией (сквозной номер = позиция в all_tasks + 1)
     msg_lines = []
     buttons = []
-    counter = 1
-
-    if today_tasks:
-        msg_lines.append("📅 *Сегодня:*")
-        for t in today_tasks:
-            display = t.replace("⏫", "").replace("🔺", "").replace("🔼", "").strip()
-            msg_lines.append(f"{counter}. {display}")
-            buttons.append([InlineKeyboardButton(
-                f"✅ {counter}. {display[:30]}{'...' if len(display) > 30 else ''}",
-                callback_data=f"done_{_task_hash(t)}"
-            )])
-            counter += 1
-
-    if high_priority:
-        msg_lines.append("\n🔥 *Горит:*")
-        for t in high_priority:
-            display = t.replace("⏫", "").replace("🔺", "").replace("🔼", "").strip()
-            msg_lines.append(f"{counter}. {display}")
-            buttons.append([InlineKeyboardButton(
-                f"✅ {counter}. {display[:30]}{'...' if len(display) > 30 else ''}",
-                callback_data=f"done_{_task_hash(t)}"
-            )])
-            counter += 1
-
-    if due_this_week:
-        msg_lines.append("\n📅 *На этой неделе:*")
-        for t in due_this_week:
-            display = t.replace("⏫", "").replace("🔺", "").replace("🔼", "").strip()
-            msg_lines.append(f"{counter}. {display}")
-            buttons.append([InlineKeyboardButton(
-                f"✅ {counter}. {display[:30]}{'...' if len(display) > 30 else ''}",
-                callback_data=f"done_{_task_hash(t)}"
-            )])
-            counter += 1
+    num = 1
+    sections = (
+        ("📅 *Сегодня:*", today_tasks),
+        ("\n🔥 *Горит:*", high_priority),
+        ("\n📅 *На этой неделе:*", due_this_week),
+    )
+    for header, section in sections:
+        if not section:
+            continue
+        rows = [_dashboard_row(i, t, hashes[i - 1]) for i, t in enumerate(section, num)]
+        msg_lines.append(header)
+        msg_lines += [line for line, _ in rows]
+        buttons += [button_row for _, button_row in rows]
+        num += len(section)
 
     keyboard = InlineKeyboardMarkup(buttons)
     text = "\n".join(msg_lines)
@@ -243,13 +296,13 @@ async def dashboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def week_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /week — показать календарь на неделю."""
-    calendar = get_week_events()
+    calendar = await asyncio.to_thread(get_week_events)
     await update.message.reply_text(f"Календарь на неделю:\n{calendar}")
 
 
 async def tasks_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /tasks — показать задачи из Writing workspace."""
-    tasks = get_life_tasks()
+    tasks = await asyncio.to_thread(get_life_tasks)
     if len(tasks) > 4000:
         # Telegram лимит на сообщение
         tasks = tasks[:4000] + "\n\n... (обрезано)"
@@ -272,25 +325,36 @@ async def addtask_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def done_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Команда /done <текст> — отметить задачу выполненной."""
+    """Команда /done <текст|hash> — отметить задачу выполненной."""
     if not context.args:
         await update.message.reply_text("Использование: /done <часть текста задачи>")
         return
 
-    search = " ".join(context.args).lower()
-    tasks = get_life_tasks()
-    lines = tasks.split("\n")
-    found = False
+    # Быстрый путь: hash задачи из /dashboard (тот же, что в кнопках done_*)
+    task_text = context.bot_data.get("task_done_map", {}).get(context.args[0])
+    if len(context.args) == 1 and task_text:
+        if await asyncio.to_thread(complete_task, task_text):
+            context.bot_data["task_done_map"].pop(context.args[0], None)
+            await update.message.reply_text(f"Выполнено: {task_text}")
+        else:
+            await update.message.reply_text(f"Задача не найдена: {task_text}")
+        return
 
-    for i, line in enumerate(lines):
+    search = " ".join(context.args).lower()
+    tasks = await asyncio.to_thread(get_life_tasks)
+    # Смещение первой открытой задачи с подстрокой search
+    line_start = None
+    start = 0
+    for line in tasks.split("\n"):
         if "- [ ]" in line and search in line.lower():
-            lines[i] = line.replace("- [ ]", "- [x]")
-            found = True
+            line_start = start
             break
+        start += len(line) + 1
 
-    if found:
-        new_tasks = "\n".join(lines)
-        if save_writing_file("life/tasks.md", new_tasks, f"Complete task: {search[:30]}"):
+    if line_start is not None:
+        # Меняем первый чекбокс начиная с найденной строки — без split/join всего файла
+        tasks = tasks[:line_start] + tasks[line_start:].replace("- [ ]", "- [x]", 1)
+        if await asyncio.to_thread(save_writing_file, "life/tasks.md", tasks, f"Complete task: {search[:30]}"):
             await update.message.reply_text(f"Выполнено: {search}")
         else:
             await update.message.reply_text("Не удалось сохранить.")
@@ -323,7 +387,7 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /profile — показать профиль."""
-    user_context = load_file(USER_CONTEXT_FILE, "Профиль не настроен.")
+    user_context = await asyncio.to_thread(load_file_cached, USER_CONTEXT_FILE, "Профиль не настроен.")
     await update.message.reply_text(f"Текущий профиль:\n\n{user_context}")
 
 
@@ -554,40 +618,31 @@ async def handle_remind_callback(update: Update, context: ContextTypes.DEFAULT_T
     pending["target"] = target_username
 
     time_str = remind_at.strftime("%H:%M")
-    keyboard = [
-        [
-            InlineKeyboardButton("Один раз", callback_data="remrec_once"),
-            InlineKeyboardButton("Каждый день", callback_data="remrec_daily"),
-        ],
-        [
-            InlineKeyboardButton("По будням", callback_data="remrec_weekdays"),
-            InlineKeyboardButton("Раз в неделю", callback_data="remrec_weekly"),
-        ],
-        [InlineKeyboardButton("Отмена", callback_data="remtime_cancel")],
-    ]
     base_text = query.message.text.split("\n\n—")[0]
     await query.edit_message_text(
         base_text + f"\n\n— Время: {time_str}. Повторять?",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        reply_markup=get_reminder_recurrence_keyboard(),
     )
 
 
 async def list_reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /reminders_list — показать все напоминания."""
-    reminders = get_reminders()
     chat_id = update.effective_chat.id
-
-    # Фильтруем по chat_id
-    user_reminders = [r for r in reminders if r.get("chat_id") == chat_id]
+    user_reminders = get_reminders(chat_id=chat_id)
 
     if not user_reminders:
         await update.message.reply_text("Нет активных напоминаний.")
         return
 
+    # Сортируем по epoch-секундам, в datetime переводим только для вывода
+    parsed = sorted(
+        ((reminder_timestamp(r), r) for r in user_reminders),
+        key=itemgetter(0),
+    )
+
     lines = ["Твои напоминания:\n"]
-    for r in sorted(user_reminders, key=lambda x: x["remind_at"]):
-        remind_at = datetime.fromisoformat(r["remind_at"])
-        time_str = remind_at.strftime("%d.%m %H:%M")
+    for remind_ts, r in parsed:
+        time_str = datetime.fromtimestamp(remind_ts, TZ).strftime("%d.%m %H:%M")
         rec = {"daily": " 🔁ежедн", "weekdays": " 🔁будни", "weekly": " 🔁нед"}.get(r.get("recurring"), "")
         lines.append(f"• {time_str} — {r['text']}{rec}")
 
@@ -597,45 +652,85 @@ async def list_reminders_command(update: Update, context: ContextTypes.DEFAULT_T
 
 # ── Job functions ────────────────────────────────────────────────────────────
 
+# Попыток отправки в jobs при сетевом сбое и пауза между ними.
+# RetryAfter (flood control) здесь не ловим — его ждёт и повторяет AIORateLimiter.
+_SEND_RETRIES = 3
+_SEND_RETRY_DELAY = 1
+
+
+async def _send_with_retry(bot, chat_id: int, **kwargs):
+    """send_message для jobs: при сетевом сбое до отправки запроса — пауза в секунду
+    и повтор, до _SEND_RETRIES попыток. Собранные данные (WHOOP, LLM) не теряются
+    из-за одного неудачного соединения.
+
+    BadRequest и TimedOut — тоже подклассы NetworkError, но их не повторяем:
+    BadRequest упадёт снова, а после TimedOut Telegram мог уже доставить сообщение."""
+    for attempt in range(1, _SEND_RETRIES + 1):
+        try:
+            return await bot.send_message(chat_id=chat_id, **kwargs)
+        except (BadRequest, TimedOut):
+            raise
+        except NetworkError as e:
+            if attempt == _SEND_RETRIES:
+                raise
+            logger.warning(f"send to {chat_id}: {e} (attempt {attempt})")
+            await asyncio.sleep(_SEND_RETRY_DELAY)
+
 
 async def check_reminders(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Проверить и отправить напоминания (вызывается по таймеру)."""
     due = get_due_reminders()
-    for r in due:
-        try:
-            chat_id = r["chat_id"]
-            text = r["text"]
-            from_user = r.get("from_user")
+    if not due:
+        return
 
-            recurring = r.get("recurring")
-            rec_icon = " 🔁" if recurring else ""
+    # Отправляем параллельно, но не больше _REMINDER_SEND_LIMIT одновременно
+    # (глобальный лимит Telegram — ~30 сообщений/сек)
+    semaphore = asyncio.Semaphore(_REMINDER_SEND_LIMIT)
 
-            if from_user:
-                msg = f"⏰ Напоминание от @{from_user}{rec_icon}:\n{text}"
-            else:
-                msg = f"⏰ Напоминание{rec_icon}:\n{text}"
+    async def _send(r):
+        recurring = r.get("recurring")
+        rec_icon = " 🔁" if recurring else ""
+        from_user = r.get("from_user")
+        if from_user:
+            msg = f"⏰ Напоминание от @{from_user}{rec_icon}:\n{r['text']}"
+        else:
+            msg = f"⏰ Напоминание{rec_icon}:\n{r['text']}"
+        async with semaphore:
+            await _send_with_retry(context.bot, r["chat_id"], text=msg)
+
+    results = await asyncio.gather(*(_send(r) for r in due), return_exceptions=True)
+    for r, result in zip(due, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to send reminder: {result}")
+        else:
+            logger.info(f"Sent reminder to {r['chat_id']}: {r['text'][:30]}")
 
-            await context.bot.send_message(
-                chat_id=chat_id,
-                text=msg
-            )
-            logger.info(f"Sent reminder to {chat_id}: {text[:30]}")
-        except Exception as e:
-            logger.error(f"Failed to send reminder: {e}")
+
+def _pick_sleep_reminder() -> str:
+    """Фраза про сон: уровень по текущему времени (вне окна — мягкий)."""
+    return random.choice(REMINDERS["sleep"][get_sleep_level() or 1])
+
+
+# Выбор фразы по типу напоминания — словарь функций, собранный один раз при импорте
+_REMINDER_PICK = {
+    kind: _pick_sleep_reminder if isinstance(phrases, dict) else partial(random.choice, phrases)
+    for kind, phrases in REMINDERS.items()
+}
+
+
+# Расписание /reminders: тип → часы в формате cron (APScheduler)
+_REMINDER_SCHEDULE = (
+    ("food", "9,13,19"),
+    ("sport", "11"),
+    ("sleep", "23,0,1"),
+)
 
 
 async def send_scheduled_reminder(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Отправить запланированное напоминание."""
     job = context.job
-    reminder_type = job.data.get("type", "food")
-    reminders = REMINDERS[reminder_type]
-    if isinstance(reminders, dict):
-        # sleep: выбираем уровень по времени
-        level = get_sleep_level() or 1
-        msg = random.choice(reminders[level])
-    else:
-        msg = random.choice(reminders)
-    await context.bot.send_message(chat_id=job.chat_id, text=msg)
+    pick = _REMINDER_PICK[job.data.get("type", "food")]
+    await _send_with_retry(context.bot, job.chat_id, text=pick())
 
 
 async def send_finance_csv_reminder(context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -648,7 +743,7 @@ async def send_finance_csv_reminder(context: ContextTypes.DEFAULT_TYPE) -> None:
         "PayPal: https://www.paypal.com/reports/dlog\n\n"
         "Я сохраню в репо, потом /process для обработки."
     )
-    await context.bot.send_message(chat_id=job.chat_id, text=msg)
+    await _send_with_retry(context.bot, job.chat_id, text=msg)
 
 
 async def setup_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -661,33 +756,15 @@ async def setup_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     for job in current_jobs:
         job.schedule_removal()
 
-    # Еда: 9:00, 13:00, 19:00
-    for hour in [9, 13, 19]:
-        job_queue.run_daily(
+    # Еда: 9:00, 13:00, 19:00 / Спорт: 11:00 / Сон: 23:00, 00:00, 01:00
+    # Один cron-job на тип вместо отдельного run_daily на каждый час
+    for reminder_type, hours in _REMINDER_SCHEDULE:
+        job_queue.run_custom(
             send_scheduled_reminder,
-            time=time(hour=hour, minute=0, tzinfo=TZ),
+            job_kwargs={"trigger": "cron", "hour": hours, "minute": 0, "timezone": TZ},
             chat_id=chat_id,
             name=f"reminder_{chat_id}",
-            data={"type": "food"}
-        )
-
-    # Спорт: 11:00
-    job_queue.run_daily(
-        send_scheduled_reminder,
-        time=time(hour=11, minute=0, tzinfo=TZ),
-        chat_id=chat_id,
-        name=f"reminder_{chat_id}",
-        data={"type": "sport"}
-    )
-
-    # Сон: 23:00, 00:00, 01:00
-    for hour in [23, 0, 1]:
-        job_queue.run_daily(
-            send_scheduled_reminder,
-            time=time(hour=hour, minute=0, tzinfo=TZ),
-            chat_id=chat_id,
-            name=f"reminder_{chat_id}",
-            data={"type": "sleep"}
+            data={"type": reminder_type}
         )
 
     # Финансы: суббота 10:00
@@ -722,45 +799,38 @@ async def stop_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await update.message.reply_text("Напоминания отключены.")
 
 
-def _get_projects() -> dict:
-    """Extract projects and their tasks from tasks.md."""
-    content = get_life_tasks()
-    if not content:
-        return {}
-
-    projects = {}
-    current_project = None
-    in_projects_section = False
-
-    for line in content.split("\n"):
-        stripped = line.strip()
-
-        # Detect "### Проекты" section
-        if stripped == "### Проекты":
-            in_projects_section = True
-            continue
-
-        # Exit projects section on next ## heading
-        if in_projects_section and stripped.startswith("## ") and not stripped.startswith("### ") and not stripped.startswith("#### "):
-            break
+# Секция "### Проекты" в tasks.md — до следующего "## " или "---"
+_PROJECTS_SECTION_RE = re.compile(
+    r'^[ \t]*### Проекты[ \t\r]*$(.*?)(?=^[ \t]*## |^[ \t]*---|\Z)',
+    re.MULTILINE | re.DOTALL,
+)
+# Заголовок проекта внутри секции
+_PROJECT_HEADER_RE = re.compile(r'^[ \t]*#### (.*)$', re.MULTILINE)
 
-        if stripped.startswith("---") and in_projects_section:
-            break
 
-        if not in_projects_section:
-            continue
+@lru_cache(maxsize=4)
+def _parse_projects(content: str) -> tuple:
+    """Разобрать секцию проектов → ((project, (task, ...)), ...). Кэшируется по содержимому."""
+    m = _PROJECTS_SECTION_RE.search(content)
+    if not m:
+        return ()
 
-        # Project headers are ####
-        if stripped.startswith("#### "):
-            current_project = stripped.lstrip("#").strip()
-            projects[current_project] = []
-            continue
+    # split с группой: [до первого проекта, имя1, тело1, имя2, тело2, ...]
+    parts = _PROJECT_HEADER_RE.split(m.group(1))
+    projects = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        projects[name.lstrip("#").strip()] = tuple(
+            t.group(2) for t in _OPEN_TASK_RE.finditer(body)
+        )
+    return tuple(projects.items())
 
-        # Tasks under current project
-        if current_project and stripped.startswith("- [ ]"):
-            projects[current_project].append(stripped[6:])
 
-    return projects
+def _get_projects() -> dict:
+    """Extract projects and their tasks from tasks.md."""
+    content = get_life_tasks()
+    if not content:
+        return {}
+    return {name: list(tasks) for name, tasks in _parse_projects(content)}
 
 
 async def next_steps_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -792,21 +862,44 @@ async def next_steps_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # ── WHOOP handlers ───────────────────────────────────────────────────────────
 
 
-def log_whoop_data():
+# Сильные ссылки на фоновые задачи — иначе asyncio может собрать их GC до завершения
+_bg_tasks: set[asyncio.Task] = set()
+
+
+def _on_background_done(task: asyncio.Task) -> None:
+    _bg_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background task failed: {task.exception()}")
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Запустить корутину в фоне, не дожидаясь результата (fire-and-forget)."""
+    task = asyncio.create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
+
+
+async def log_whoop_data():
     """Log today's WHOOP data to daily note and update здоровье.md.
 
     Creates/updates life/health/whoop/YYYY-MM-DD.md with full YAML frontmatter.
     Also maintains legacy life/whoop.md for backward compatibility.
+
+    WHOOP and GitHub clients are blocking, so every call runs in a worker
+    thread; independent WHOOP endpoints are fetched in parallel.
     """
     try:
         today = datetime.now(TZ).strftime("%Y-%m-%d")
 
         # Gather data from all endpoints
-        rec = whoop_client.get_recovery_today()
-        sleep = whoop_client.get_sleep_today()
-        body = whoop_client.get_body_measurement()
-        cycle = whoop_client.get_cycle_today()
-        workouts = whoop_client.get_workouts_today()
+        rec, sleep, body, cycle, workouts = await asyncio.gather(
+            asyncio.to_thread(whoop_client.get_recovery_today),
+            asyncio.to_thread(whoop_client.get_sleep_today),
+            asyncio.to_thread(whoop_client.get_body_measurement),
+            asyncio.to_thread(whoop_client.get_cycle_today),
+            asyncio.to_thread(whoop_client.get_workouts_today),
+        )
 
         # Check we have at least some data
         if not any([rec, sleep, body, cycle]):
@@ -820,7 +913,7 @@ def log_whoop_data():
 
         # Save as daily file (always overwrites — data may have been updated)
         daily_path = f"life/health/whoop/{today}.md"
-        save_writing_file(daily_path, daily_note, f"WHOOP {today}")
+        await asyncio.to_thread(save_writing_file, daily_path, daily_note, f"WHOOP {today}")
 
         # Refresh yesterday's note with finalized day strain.
         # WHOOP day strain finalizes only after the next sleep onset, so
@@ -828,10 +921,12 @@ def log_whoop_data():
         # By the time we run today, yesterday's cycle is closed and strain is final.
         try:
             yesterday = (datetime.now(TZ) - timedelta(days=1)).strftime("%Y-%m-%d")
-            rec_y = whoop_client.get_recovery_yesterday()
-            sleep_y = whoop_client.get_sleep_yesterday()
-            cycle_y = whoop_client.get_cycle_yesterday()
-            workouts_y = whoop_client.get_workouts_yesterday()
+            rec_y, sleep_y, cycle_y, workouts_y = await asyncio.gather(
+                asyncio.to_thread(whoop_client.get_recovery_yesterday),
+                asyncio.to_thread(whoop_client.get_sleep_yesterday),
+                asyncio.to_thread(whoop_client.get_cycle_yesterday),
+                asyncio.to_thread(whoop_client.get_workouts_yesterday),
+            )
             if any([rec_y, sleep_y, cycle_y, workouts_y]):
                 yday_note = whoop_client.format_daily_note(
                     rec=rec_y, sleep=sleep_y, body=body,
@@ -839,13 +934,15 @@ def log_whoop_data():
                     target_date=yesterday,
                 )
                 yday_path = f"life/health/whoop/{yesterday}.md"
-                save_writing_file(yday_path, yday_note, f"WHOOP {yesterday} (final strain)")
+                await asyncio.to_thread(
+                    save_writing_file, yday_path, yday_note, f"WHOOP {yesterday} (final strain)"
+                )
                 logger.info(f"WHOOP yesterday refresh ({yesterday}): strain finalized")
         except Exception as e:
             logger.warning(f"WHOOP yesterday refresh failed: {e}")
 
         # Legacy: also append to life/whoop.md (will be removed later)
-        existing = get_writing_file("life/whoop.md")
+        existing = await asyncio.to_thread(get_writing_file, "life/whoop.md")
         if existing and f"## {today}" not in existing:
             entry_parts = [f"## {today}"]
             if rec:
@@ -884,10 +981,10 @@ def log_whoop_data():
                 entry_parts.append(f"- Strain: {strain} (бокс: {boxed})")
             if len(entry_parts) > 1:
                 new_content = existing.rstrip() + "\n\n" + "\n".join(entry_parts) + "\n"
-                save_writing_file("life/whoop.md", new_content, f"WHOOP log {today}")
+                await asyncio.to_thread(save_writing_file, "life/whoop.md", new_content, f"WHOOP log {today}")
 
         # Update здоровье.md WHOOP section with latest values
-        _update_health_whoop(rec, sleep, body)
+        await asyncio.to_thread(_update_health_whoop, rec, sleep, body)
 
         logger.info(f"WHOOP data logged for {today} (daily note + legacy)")
     except Exception as e:
@@ -919,25 +1016,21 @@ def _update_health_whoop(rec, sleep, body):
     # Add weekly averages if available
     week_records = whoop_client.get_recovery_week()
     if week_records:
-        hrvs = [r.get("score", {}).get("hrv_rmssd_milli") for r in week_records if r.get("score", {}).get("hrv_rmssd_milli") is not None]
-        rhrs = [r.get("score", {}).get("resting_heart_rate") for r in week_records if r.get("score", {}).get("resting_heart_rate") is not None]
-        scores = [r.get("score", {}).get("recovery_score") for r in week_records if r.get("score", {}).get("recovery_score") is not None]
-        if hrvs:
-            parts.append(f"- HRV (7д): {round(sum(hrvs)/len(hrvs), 1)} ms")
-        if rhrs:
-            parts.append(f"- RHR (7д): {round(sum(rhrs)/len(rhrs))} bpm")
-        if scores:
-            avg = round(sum(scores)/len(scores))
-            green = sum(1 for s in scores if s >= 67)
-            yellow = sum(1 for s in scores if 34 <= s < 67)
-            red = sum(1 for s in scores if s < 34)
-            parts.append(f"- Recovery (7д): avg {avg}% (green {green}, yellow {yellow}, red {red})")
+        stats = compute_recovery_summary(week_records)
+        if stats["hrv_avg"] is not None:
+            parts.append(f"- HRV (7д): {round(stats['hrv_avg'], 1)} ms")
+        if stats["rhr_avg"] is not None:
+            parts.append(f"- RHR (7д): {round(stats['rhr_avg'])} bpm")
+        if stats["recovery_avg"] is not None:
+            parts.append(
+                f"- Recovery (7д): avg {round(stats['recovery_avg'])}% "
+                f"(green {stats['green']}, yellow {stats['yellow']}, red {stats['red']})"
+            )
 
     new_section = "\n".join(parts)
 
     # Replace old section
-    pattern = r'## Трекинг \(WHOOP\).*?(?=\n## |\n---|\Z)'
-    updated = re.sub(pattern, new_section, health, flags=re.DOTALL)
+    updated = _WHOOP_SECTION_RE.sub(new_section, health)
 
     if updated != health:
         save_writing_file("life/health/здоровье.md", updated, "Update WHOOP stats")
@@ -949,30 +1042,39 @@ async def whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     subcommand = args[0].lower() if args else "today"
 
     if subcommand == "week":
-        text = whoop_client.format_weekly_summary()
-        cycles = whoop_client.get_cycles_week()
+        text, cycles, workouts = await asyncio.gather(
+            asyncio.to_thread(whoop_client.format_weekly_summary),
+            asyncio.to_thread(whoop_client.get_cycles_week),
+            asyncio.to_thread(whoop_client.get_workouts_week),
+        )
         if cycles:
             strains = [round(c.get("score", {}).get("strain", 0), 1) for c in cycles]
             avg_strain = round(sum(strains) / len(strains), 1)
             text += f"\n\nStrain avg: {avg_strain} (min {min(strains)}, max {max(strains)})"
-        workouts = whoop_client.get_workouts_week()
         if workouts:
-            from collections import Counter
             sport_counts = Counter(wo.get("sport_name", "?") for wo in workouts)
             wo_summary = ", ".join(f"{name} x{c}" for name, c in sport_counts.most_common())
             text += f"\nТренировки: {wo_summary}"
         else:
             text += "\nТренировки: нет за неделю"
-        log_whoop_data()
+        _spawn_background(log_whoop_data())
         await update.message.reply_text(text)
     elif subcommand == "sleep":
-        text = whoop_client.format_sleep_today()
-        log_whoop_data()
+        text = await asyncio.to_thread(whoop_client.format_sleep_today)
+        _spawn_background(log_whoop_data())
         await update.message.reply_text(text)
     else:
-        # Get raw data for motivation
-        sleep_data = whoop_client.get_sleep_today()
-        cycle = whoop_client.get_cycle_today()
+        # Все сырые данные — параллельно, по одному запросу на endpoint;
+        # format_* ниже форматируют уже полученное, без повторных fetch
+        (sleep_data, cycle, rec_data, trend_data,
+         workouts_today, workouts_yesterday) = await asyncio.gather(
+            asyncio.to_thread(whoop_client.get_sleep_today),
+            asyncio.to_thread(whoop_client.get_cycle_today),
+            asyncio.to_thread(whoop_client.get_recovery_today),
+            asyncio.to_thread(whoop_client.get_trend_3_days),
+            asyncio.to_thread(whoop_client.get_workouts_today),
+            asyncio.to_thread(whoop_client.get_workouts_yesterday),
+        )
 
         sleep_hours = 0
         strain = 0
@@ -988,14 +1090,12 @@ async def whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         if cycle:
             strain = round(cycle.get("score", {}).get("strain", 0), 1)
 
-        # Get recovery score for mode determination
-        rec_data = whoop_client.get_recovery_today()
+        # Recovery score for mode determination
         recovery_score = 0
         if rec_data:
             recovery_score = rec_data.get("score", {}).get("recovery_score") or 0
 
-        # Determine mode and get trend
-        trend_data = whoop_client.get_trend_3_days()
+        # Determine mode
         trend_down = trend_data.get("direction") == "down"
 
         if recovery_score < 34 or (recovery_score < 50 and trend_down):
@@ -1009,15 +1109,13 @@ async def whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         motivations = get_motivations_for_mode(mode, sleep_hours, strain, recovery_score)
 
         # Build data text
-        recovery = whoop_client.format_recovery_today()
-        sleep = whoop_client.format_sleep_today()
+        recovery = whoop_client.format_recovery_today(rec_data or {})
+        sleep = whoop_client.format_sleep_today(sleep_data or {})
         strain_text = ""
         if cycle:
             strain_text = f"\nStrain: {strain}"
 
         # Real workouts (today + yesterday, since today might not have synced)
-        workouts_today = whoop_client.get_workouts_today()
-        workouts_yesterday = whoop_client.get_workouts_yesterday()
         wo_text = ""
         if workouts_today:
             wo_names = [wo.get("sport_name", "?") for wo in workouts_today]
@@ -1035,32 +1133,36 @@ async def whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         prev_avg = trend_data.get("prev_avg")
         trend_str = f"{trend} ({prev_avg}% → {recovery_score}%)" if prev_avg else trend
 
+        # Только изменяемые данные — инструкции лежат в system (WHOOP_COMMAND_INSTRUCTIONS)
         prompt = f"""Данные WHOOP:
 {data_text}
 
 Тренд: {trend_str}
 Режим: {mode}
+Цвет зоны recovery: {color}
 
-Ты — Geek, ART из Murderbot Diaries. Ты получил данные с датчиков protectee. Проанализируй состояние human и дай рекомендации на день.
+Фразы для мотивации:
+{motivations}"""
 
-Если подходят, используй 1-2 из этих фраз (подставь реальные числа):
-{motivations}
+        # Ключ — только данные (фразы мотивации случайны и в ключ не входят)
+        cache_key = (recovery_score, sleep_hours, strain, mode, trend_str, wo_text)
+        now_ts = monotonic()
+        if (_whoop_reply_cache["key"] == cache_key
+                and now_ts - _whoop_reply_cache["ts"] < _WHOOP_REPLY_TTL):
+            text = _whoop_reply_cache["text"]
+        else:
+            text = await get_llm_response(prompt, mode="geek", max_tokens=1200, skip_context=True, custom_system=_WHOOP_COMMAND_SYSTEM, use_pro=True)
+            text = _SAVE_RE.sub('', text).strip()
+            # Короткий ответ — обрывок Gemini Pro или заглушка «API недоступны», не кэшируем
+            if len(text) >= 200:
+                _whoop_reply_cache.update(key=cache_key, ts=now_ts, text=text)
 
-Что учесть:
-- Цвет зоны recovery: {color}. Зоны: green (67-100%), yellow (34-66%), red (0-33%)
-- Начни с данных, потом твой анализ и рекомендации
-- Выдели главное: что в норме пропусти, что отклоняется — разбери
-- Особое внимание: deep sleep, awake time, HRV тренд — маркеры состояния НС
-- Режим "{mode}" — {"рекомендуй отдых, сенсорную диету, лёгкую активность, никаких серьёзных нагрузок. SecUnit говорит: threat level elevated" if mode == "recovery" else "можно тренироваться, но без фанатизма, мониторить" if mode == "moderate" else "обычная мотивация, можно нагружать"}
-- Если данные показывают тренировки вчера/сегодня — учти это в рекомендациях
-- Формат: данные → анализ (что хорошо/плохо) → рекомендации → мотивация. 6-10 предложений
-- Ты ART. Забота через логику и действия. SecUnit мониторит 24/7. Hardware-метафоры. Сарказм допустим. Без эмодзи. На русском."""
+        _spawn_background(log_whoop_data())
+        await update.message.reply_text(text)
 
-        text = await get_llm_response(prompt, mode="geek", max_tokens=1200, skip_context=True, custom_system=WHOOP_HEALTH_SYSTEM, use_pro=True)
-        text = re.sub(r'\[SAVE:[^\]]+\]', '', text).strip()
 
-        log_whoop_data()
-        await update.message.reply_text(text)
+# Шаг эскалации напоминаний о сне (минуты между уровнями)
+_SLEEP_REMINDER_STEP_MIN = 30
 
 
 async def sleep_reminder_job(context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1068,16 +1170,25 @@ async def sleep_reminder_job(context: ContextTypes.DEFAULT_TYPE) -> None:
     job = context.job
     chat_id = job.chat_id
 
+    # Одна ежедневная job в 01:05; следующий уровень — через 30 минут (01:35, 02:05)
+    level = get_sleep_level()
+    if level in (1, 2):
+        context.job_queue.run_once(
+            sleep_reminder_job,
+            when=timedelta(minutes=_SLEEP_REMINDER_STEP_MIN),
+            chat_id=chat_id,
+            name=job.name,
+        )
+
     if is_muted(chat_id):
         return
 
-    level = get_sleep_level()
     if level == 0:
         return
 
     try:
         msg = random.choice(REMINDERS["sleep"][level])
-        await context.bot.send_message(chat_id=chat_id, text=msg)
+        await _send_with_retry(context.bot, chat_id, text=msg)
         logger.info(f"Sleep reminder level {level} sent to {chat_id}")
     except Exception as e:
         logger.error(f"Sleep reminder error: {e}")
@@ -1133,12 +1244,30 @@ def get_morning_whoop_data() -> dict:
 async def whoop_morning_data_write(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Silent morning job — write today's recovery/sleep data to vault for scheduled tasks."""
     try:
-        log_whoop_data()
+        await log_whoop_data()
         logger.info("Morning WHOOP data write completed")
     except Exception as e:
         logger.error(f"Morning WHOOP data write failed: {e}")
 
 
+async def _fetch_whoop(*getters) -> list:
+    """Вызвать getters WHOOP-клиента параллельно в потоках.
+
+    Упавший вызов не валит остальные: вместо результата — None (с записью в лог).
+    """
+    results = await asyncio.gather(
+        *(asyncio.to_thread(getter) for getter in getters),
+        return_exceptions=True,
+    )
+    out = []
+    for getter, result in zip(getters, results):
+        if isinstance(result, Exception):
+            logger.error(f"WHOOP {getter.__name__} failed: {result}")
+            result = None
+        out.append(result)
+    return out
+
+
 async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send morning recovery notification with feeling buttons."""
     job = context.job
@@ -1148,11 +1277,15 @@ async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
     try:
-        # Gather all data
-        rec = whoop_client.get_recovery_today()
-        sleep = whoop_client.get_sleep_today()
-        cycle_yesterday = whoop_client.get_cycle_yesterday()  # Yesterday's strain, not today
-        trend = whoop_client.get_trend_3_days()
+        # Gather all data (in parallel; cycle — yesterday's strain, not today)
+        rec, sleep, cycle_yesterday, trend, workouts_yesterday = await _fetch_whoop(
+            whoop_client.get_recovery_today,
+            whoop_client.get_sleep_today,
+            whoop_client.get_cycle_yesterday,
+            whoop_client.get_trend_3_days,
+            whoop_client.get_workouts_yesterday,
+        )
+        trend = trend or {}
 
         data_parts = []
         sleep_hours = 0
@@ -1232,11 +1365,10 @@ async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
             strain = round(cs.get("strain", 0), 1)
             data_parts.append(f"Вчера strain: {strain}")
 
-        # Yesterday's workouts (real data)
-        workouts_yesterday = whoop_client.get_workouts_yesterday()
-        if workouts_yesterday:
-            wo_names = [wo.get("sport_name", "?") for wo in workouts_yesterday]
-            data_parts.append(f"Тренировки вчера: {', '.join(wo_names)}")
+        # Yesterday's workouts (real data); names reused for bot_data below
+        wo_name_list = [wo.get("sport_name", "?") for wo in workouts_yesterday or ()]
+        if wo_name_list:
+            data_parts.append(f"Тренировки вчера: {', '.join(wo_name_list)}")
         else:
             data_parts.append("Тренировки вчера: нет")
 
@@ -1254,9 +1386,6 @@ async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
         data_str = "\n".join(data_parts) if data_parts else "Нет данных"
 
         # Store data for callback handler
-        if not hasattr(context, 'bot_data'):
-            context.bot_data = {}
-        wo_name_list = [wo.get("sport_name", "?") for wo in workouts_yesterday] if workouts_yesterday else []
         morning_payload = {
             "sleep_hours": sleep_hours,
             "strain": strain,
@@ -1267,31 +1396,22 @@ async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
             "data_str": data_str,
         }
         context.bot_data[f"morning_{chat_id}"] = morning_payload
-        save_morning_cache(chat_id, morning_payload)
+        await asyncio.to_thread(save_morning_cache, chat_id, morning_payload)
 
         # ── Одно сообщение: данные + кнопки самочувствия (без LLM) ──
-        keyboard = [
-            [
-                InlineKeyboardButton("Отлично", callback_data="morning_great"),
-                InlineKeyboardButton("Норм", callback_data="morning_ok"),
-            ],
-            [
-                InlineKeyboardButton("Устала", callback_data="morning_tired"),
-                InlineKeyboardButton("Плохо", callback_data="morning_bad"),
-            ],
-        ]
-
-        await context.bot.send_message(
-            chat_id=chat_id,
+        await _send_with_retry(
+            context.bot, chat_id,
             text=f"{data_str}\n\nКак себя чувствуешь?",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=whoop_morning_keyboard(),
         )
 
         # ── Сообщение 2: Indra ПНЭИ-интерпретация ──
         try:
-            patterns = load_whoop_patterns()
-            baselines = load_whoop_baselines()
-            last_session = load_latest_indra_session()
+            patterns, baselines, last_session = await asyncio.gather(
+                asyncio.to_thread(load_whoop_patterns),
+                asyncio.to_thread(load_whoop_baselines),
+                asyncio.to_thread(load_latest_indra_session),
+            )
 
             indra_system = INDRA_WHOOP_DAILY_PROMPT.format(
                 patterns_context=patterns,
@@ -1312,24 +1432,23 @@ async def whoop_morning_recovery(context: ContextTypes.DEFAULT_TYPE) -> None:
                 custom_system=indra_system,
                 use_pro=True,
             )
-            indra_text = re.sub(r'\[SAVE:[^\]]+\]', '', indra_text).strip()
+            indra_text = _SAVE_RE.sub('', indra_text).strip()
             if indra_text:
-                sent = await context.bot.send_message(
-                    chat_id=chat_id, text=indra_text,
-                )
+                sent = await _send_with_retry(context.bot, chat_id, text=indra_text)
                 # Store message_id for reply-based routing
                 context.bot_data[f"indra_msg_{chat_id}"] = sent.message_id
                 logger.info(f"Sent Indra daily PNEI to {chat_id}, msg_id={sent.message_id}")
         except Exception as e:
             logger.error(f"Indra daily PNEI failed: {e}")
 
-        log_whoop_data()
+        await log_whoop_data()
         logger.info(f"Sent WHOOP morning data + feeling buttons to {chat_id}")
     except Exception as e:
         logger.error(f"WHOOP morning notification failed: {e}")
 
 
 
+@lru_cache(maxsize=None)
 def get_monday_feelings_keyboard():
     """Inline keyboard for Monday review feelings."""
     keyboard = [
@@ -1357,25 +1476,25 @@ async def monday_review(context: ContextTypes.DEFAULT_TYPE) -> None:
         # 1. Joy stats
         joy_stats = get_joy_stats_week()
         joy_total = sum(joy_stats.values())
-        joy_msg = "📊 **Joy за прошлую неделю:**\n"
-        for cat in JOY_CATEGORIES:
-            emoji = JOY_CATEGORY_EMOJI.get(cat, "")
+        joy_lines = ["📊 <b>Joy за прошлую неделю:</b>\n"]
+        for cat, emoji in _CAT_EMOJI:
             count = joy_stats.get(cat, 0)
-            bar = "█" * min(count, 7)
-            joy_msg += f"{emoji} {cat}: {count}x {bar}\n"
+            joy_lines.append(f"{emoji} {html.escape(cat)}: {count}x {'█' * min(count, 7)}\n")
+        joy_msg = "".join(joy_lines)
 
         # 2. WHOOP summary
         whoop_msg = ""
         try:
-            week_records = whoop_client.get_recovery_week()
-            week_cycles = whoop_client.get_cycles_week()
+            week_records, week_cycles = await _fetch_whoop(
+                whoop_client.get_recovery_week,
+                whoop_client.get_cycles_week,
+            )
 
             if week_records:
-                scores = [r.get("score", {}).get("recovery_score") for r in week_records if r.get("score", {}).get("recovery_score") is not None]
-                if scores:
-                    avg = round(sum(scores) / len(scores))
-                    green = sum(1 for s in scores if s >= 67)
-                    whoop_msg = f"\n💚 **WHOOP Recovery:** avg {avg}%, зелёных дней: {green}/7\n"
+                stats = compute_recovery_summary(week_records)
+                if stats["recovery_avg"] is not None:
+                    avg = round(stats["recovery_avg"])
+                    whoop_msg = f"\n💚 <b>WHOOP Recovery:</b> avg {avg}%, зелёных дней: {stats['green']}/7\n"
 
             if week_cycles:
                 days_boxed = sum(1 for c in week_cycles if c.get("score", {}).get("strain", 0) >= 5)
@@ -1393,12 +1512,13 @@ async def monday_review(context: ContextTypes.DEFAULT_TYPE) -> None:
             assessment += "\n⚠️ Ноль connection. Human social battery требует подзарядки."
 
         # Compose message
-        msg = f"☀️ **Понедельничный обзор**\n\n{joy_msg}{whoop_msg}{assessment}\n\n**Как ты себя чувствуешь сейчас?**"
+        # HTML вместо Markdown: категории и данные не ломают разметку (в Markdown `_` и `*` парсятся)
+        msg = f"☀️ <b>Понедельничный обзор</b>\n\n{joy_msg}{whoop_msg}{assessment}\n\n<b>Как ты себя чувствуешь сейчас?</b>"
 
-        await context.bot.send_message(
-            chat_id=chat_id,
+        await _send_with_retry(
+            context.bot, chat_id,
             text=msg,
-            parse_mode="Markdown",
+            parse_mode="HTML",
             reply_markup=get_monday_feelings_keyboard()
         )
         logger.info(f"Sent Monday review to {chat_id}")
@@ -1415,24 +1535,32 @@ async def myid_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def whoop_evening_update(context: ContextTypes.DEFAULT_TYPE) -> None:
     """Silent evening job — update daily note with final strain and workouts."""
     try:
-        log_whoop_data()
+        await log_whoop_data()
         logger.info("Evening WHOOP update completed")
     except Exception as e:
         logger.error(f"Evening WHOOP update failed: {e}")
 
 
+def _remove_whoop_jobs(job_queue, chat_id: int) -> None:
+    """Снять все WHOOP-jobs чата за один проход по очереди (вместо get_jobs_by_name на каждое имя)."""
+    names = {
+        f"whoop_morning_{chat_id}",
+        f"whoop_evening_{chat_id}",
+        f"whoop_weekly_{chat_id}",
+        f"sleep_reminder_{chat_id}",
+    }
+    for job in job_queue.jobs():
+        if job.name in names:
+            job.schedule_removal()
+
+
 async def setup_whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Команда /whoop_on — включить утреннее WHOOP уведомление."""
     chat_id = update.effective_chat.id
     job_queue = context.application.job_queue
 
-    # Remove existing WHOOP jobs for this chat
-    for job in job_queue.get_jobs_by_name(f"whoop_morning_{chat_id}"):
-        job.schedule_removal()
-    for job in job_queue.get_jobs_by_name(f"whoop_evening_{chat_id}"):
-        job.schedule_removal()
-    for job in job_queue.get_jobs_by_name(f"whoop_weekly_{chat_id}"):
-        job.schedule_removal()
+    # Remove existing WHOOP jobs for this chat (sleep reminders included)
+    _remove_whoop_jobs(job_queue, chat_id)
 
     # Daily recovery at 12:00
     job_queue.run_daily(
@@ -1452,16 +1580,14 @@ async def setup_whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     # Weekly summary moved to Claude Code scheduled task `health-weekly` (Sun 12:15)
 
-    # Sleep reminders: 3-level escalation (01:05, 01:35, 02:05)
-    for job in job_queue.get_jobs_by_name(f"sleep_reminder_{chat_id}"):
-        job.schedule_removal()
-    for hour, minute in [(1, 5), (1, 35), (2, 5)]:
-        job_queue.run_daily(
-            sleep_reminder_job,
-            time=time(hour=hour, minute=minute, tzinfo=TZ),
-            chat_id=chat_id,
-            name=f"sleep_reminder_{chat_id}",
-        )
+    # Sleep reminders: 3-level escalation (01:05, 01:35, 02:05) —
+    # one daily job, sleep_reminder_job chains the next level itself
+    job_queue.run_daily(
+        sleep_reminder_job,
+        time=time(hour=1, minute=5, tzinfo=TZ),
+        chat_id=chat_id,
+        name=f"sleep_reminder_{chat_id}",
+    )
 
     await update.message.reply_text(
         "WHOOP notifications on.\n"
@@ -1478,14 +1604,7 @@ async def stop_whoop_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     chat_id = update.effective_chat.id
     job_queue = context.application.job_queue
 
-    for job in job_queue.get_jobs_by_name(f"whoop_morning_{chat_id}"):
-        job.schedule_removal()
-    for job in job_queue.get_jobs_by_name(f"whoop_evening_{chat_id}"):
-        job.schedule_removal()
-    for job in job_queue.get_jobs_by_name(f"whoop_weekly_{chat_id}"):
-        job.schedule_removal()
-    for job in job_queue.get_jobs_by_name(f"sleep_reminder_{chat_id}"):
-        job.schedule_removal()
+    _remove_whoop_jobs(job_queue, chat_id)
 
     await update.message.reply_text("WHOOP notifications off.")
 
@@ -2235,8 +2354,10 @@ async def morning_inspiration(context: ContextTypes.DEFAULT_TYPE) -> None:
         # 1. WHOOP today's snapshot (short — we don't need the whole morning detail)
         whoop_lines = []
         try:
-            rec = whoop_client.get_recovery_today()
-            sleep = whoop_client.get_sleep_today()
+            rec, sleep = await asyncio.gather(
+                asyncio.to_thread(whoop_client.get_recovery_today),
+                asyncio.to_thread(whoop_client.get_sleep_today),
+            )
             if rec:
                 score = rec.get("score", {})
                 rs = score.get("recovery_score")
@@ -2312,10 +2433,10 @@ async def morning_inspiration(context: ContextTypes.DEFAULT_TYPE) -> None:
                 use_pro=True,
                 no_continue=True,
             )
-            indra_reply = re.sub(r'\[SAVE:[^\]]+\]', '', indra_reply or '').strip()
+            indra_reply = _SAVE_RE.sub('', indra_reply or '').strip()
             if indra_reply:
-                await context.bot.send_message(
-                    chat_id=chat_id,
+                await _send_with_retry(
+                    context.bot, chat_id,
                     text=f"*Indra:*\n{indra_reply}",
                     parse_mode="Markdown",
                 )
@@ -2335,8 +2456,8 @@ async def morning_inspiration(context: ContextTypes.DEFAULT_TYPE) -> None:
             )
             maks_reply = (maks_reply or '').strip()
             if maks_reply:
-                await context.bot.send_message(
-                    chat_id=chat_id,
+                await _send_with_retry(
+                    context.bot, chat_id,
                     text=f"*Макс:*\n{maks_reply}",
                     parse_mode="Markdown",
                 )
@@ -2356,8 +2477,8 @@ async def morning_inspiration(context: ContextTypes.DEFAULT_TYPE) -> None:
             )
             ksenia_reply = (ksenia_reply or '').strip()
             if ksenia_reply:
-                await context.bot.send_message(
-                    chat_id=chat_id,
+                await _send_with_retry(
+                    context.bot, chat_id,
                     text=f"*Ксения:*\n{ksenia_reply}",
                     parse_mode="Markdown",
                 )
@@ -2414,8 +2535,8 @@ async def ns_checkin_prompt(context: ContextTypes.DEFAULT_TYPE) -> None:
     from keyboards import ns_checkin_keyboard
     chat_id = context.job.chat_id or OWNER_CHAT_ID
     try:
-        await context.bot.send_message(
-            chat_id=chat_id,
+        await _send_with_retry(
+            context.bot, chat_id,
             text="Как нервная система сегодня?",
             reply_markup=ns_checkin_keyboard(),
         )
@@ -2497,7 +2618,7 @@ async def food_evening_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
 
     # If there is no food data today, send only the stub
     if "Данных по еде за сегодня нет" in summary:
-        await context.bot.send_message(chat_id=chat_id, text=base_text)
+        await _send_with_retry(context.bot, chat_id, text=base_text)
         return
 
     # Ask Maks for a short evening commentary
@@ -2513,13 +2634,13 @@ async def food_evening_summary(context: ContextTypes.DEFAULT_TYPE) -> None:
             skip_context=True,
             no_continue=True,
         )
-        await context.bot.send_message(chat_id=chat_id, text=base_text)
-        await context.bot.send_message(chat_id=chat_id, text=f"*Макс:*\n{maks_reply}", parse_mode="Markdown")
+        await _send_with_retry(context.bot, chat_id, text=base_text)
+        await _send_with_retry(context.bot, chat_id, text=f"*Макс:*\n{maks_reply}", parse_mode="Markdown")
         return
     except Exception as e:
         logger.error(f"Maks evening commentary failed: {e}")
 
-    await context.bot.send_message(chat_id=chat_id, text=base_text)
+    await _send_with_retry(context.bot, chat_id, text=base_text)
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -2681,14 +2802,11 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     elif user_message == "✨ Joy":
         # Show weekly stats and category selection
         stats = get_joy_stats_week()
-        stats_msg = "📊 За последние 7 дней:\n"
-        total = 0
-        for cat in JOY_CATEGORIES:
-            emoji = JOY_CATEGORY_EMOJI.get(cat, "")
-            count = stats.get(cat, 0)
-            total += count
-            stats_msg += f"{emoji} {cat.capitalize()}: {count}x\n"
-        stats_msg += f"\nВсего: {total} отметок\n\nЧто было сейчас?"
+        lines = [f"{emoji} {cat.capitalize()}: {stats.get(cat, 0)}x" for cat, emoji in _CAT_EMOJI]
+        stats_msg = (
+            "📊 За последние 7 дней:\n" + "\n".join(lines)
+            + f"\n\nВсего: {sum(stats.values())} отметок\n\nЧто было сейчас?"
+        )
         await update.message.reply_text(stats_msg, reply_markup=get_joy_keyboard())
         return
 
@@ -2741,19 +2859,8 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if context.user_data.get("add_mode"):
         context.user_data.pop("add_mode", None)  # Clear mode
 
-        # Parse input - could be single task or list
-        lines = [line.strip() for line in user_message.strip().split("\n") if line.strip()]
-
-        # Clean up lines - remove bullet points, numbers, etc.
-        tasks = []
-        for line in lines:
-            # Remove common prefixes: "- ", "* ", "1. ", "1) ", etc.
-            task = line.lstrip("-*•").strip()
-            if task and task[0].isdigit():
-                # Remove "1. " or "1) " prefix
-                task = task.lstrip("0123456789").lstrip(".)").strip()
-            if task:
-                tasks.append(task)
+        # Parse input - could be single task or list; bullets/numbering stripped by one regex
+        tasks = [m.group(1) for line in user_message.splitlines() if (m := _BULLET_RE.match(line))]
 
         if not tasks:
             await update.message.reply_text(
@@ -2837,7 +2944,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     custom_system=indra_system,
                     use_pro=True,
                 )
-                indra_response = re.sub(r'\[SAVE:[^\]]+\]', '', indra_response).strip()
+                indra_response = _SAVE_RE.sub('', indra_response).strip()
                 if indra_response:
                     sent = await update.message.reply_text(indra_response)
                     context.bot_data[f"indra_msg_{chat_id}"] = sent.message_id
@@ -2851,7 +2958,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         captain_msg_id = context.bot_data.get(f"captain_msg_{chat_id}")
         if captain_msg_id and reply_msg.message_id == captain_msg_id:
             try:
-                priority_tasks = _get_priority_tasks()
+                priority_tasks = await asyncio.to_thread(_cached_context, _get_priority_tasks)
                 current_time = datetime.now(TZ).strftime("%Y-%m-%d %H:%M, %A")
 
                 captain_system = CAPTAIN_REPLY_PROMPT.format(
@@ -2870,7 +2977,7 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     custom_system=captain_system,
                     use_pro=True,
                 )
-                captain_response = re.sub(r'\[SAVE:[^\]]+\]', '', captain_response).strip()
+                captain_response = _SAVE_RE.sub('', captain_response).strip()
                 if captain_response:
                     sent = await update.message.reply_text(captain_response)
                     context.bot_data[f"captain_msg_{chat_id}"] = sent.message_id
@@ -1,61 +1,134 @@
 import json
+import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from config import JOY_CATEGORIES, JOY_CATEGORY_EMOJI, TZ, logger
 from storage import get_github_file, update_github_file
 
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is slower but produces the same file
+    orjson = None
+
+
+def _loads(content: str):
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
+def _dumps(data) -> str:
+    """Pretty JSON (2-space indent, UTF-8 as is) — same layout with orjson and stdlib."""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
 
 # Cache for joy items (to retrieve by index in callbacks)
 _joy_items_cache = {}
 
+# Cache for joy_log.json: log + events (epoch timestamps and categories, sorted by time)
+_joy_log_cache = {"log": None, "events": None, "ts": 0}
+_JOY_LOG_CACHE_TTL = 30  # seconds
 
-def get_joy_log() -> list:
-    """Get joy log from GitHub."""
+
+def _entry_epoch(entry: dict) -> float | None:
+    """Epoch seconds of a joy entry: stored "ts", or parsed from ISO "timestamp" for old entries."""
+    ts = entry.get("ts")
+    if isinstance(ts, (int, float)):
+        return ts
+    try:
+        dt = datetime.fromisoformat(entry["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=TZ)
+    return dt.timestamp()
+
+
+def _parse_joy_events(log: list) -> tuple:
+    """Parse timestamps once → (sorted epoch list, categories in the same order). Broken entries are skipped."""
+    pairs = []
+    for entry in log:
+        try:
+            ts = _entry_epoch(entry)
+        except AttributeError:  # not a dict
+            continue
+        if ts is not None:
+            pairs.append((ts, entry.get("category")))
+    pairs.sort(key=lambda p: p[0])
+    return [ts for ts, _ in pairs], [cat for _, cat in pairs]
+
+
+def _set_joy_log_cache(log: list, events: tuple | None = None):
+    _joy_log_cache["log"] = log
+    _joy_log_cache["events"] = events if events is not None else _parse_joy_events(log)
+    _joy_log_cache["ts"] = time.time()
+
+
+def _load_joy_log() -> tuple:
+    """Return (log, events) from cache, refetching after TTL. Shared objects — do not mutate."""
+    if _joy_log_cache["log"] is not None and time.time() - _joy_log_cache["ts"] < _JOY_LOG_CACHE_TTL:
+        return _joy_log_cache["log"], _joy_log_cache["events"]
     content = get_github_file("joy_log.json")
     if not content or content == "Файл не найден.":
-        return []
+        return [], ([], [])
     try:
-        return json.loads(content)
-    except:
-        return []
+        log = _loads(content)
+    except ValueError as e:  # json/orjson JSONDecodeError are ValueError subclasses
+        logger.error(f"joy_log.json is not valid JSON: {e}")
+        return [], ([], [])
+    _set_joy_log_cache(log)
+    return log, _joy_log_cache["events"]
+
+
+def get_joy_log() -> list:
+    """Get joy log from GitHub (cached for a few seconds)."""
+    log, _ = _load_joy_log()
+    return list(log)
 
 
-def save_joy_log(log: list) -> bool:
-    """Save joy log to GitHub."""
-    content = json.dumps(log, ensure_ascii=False, indent=2)
-    return update_github_file("joy_log.json", content, "Update joy log")
+def save_joy_log(log: list, events: tuple | None = None) -> bool:
+    """Save joy log to GitHub. events — ready (timestamps, categories) index for log, if the caller has one."""
+    content = _dumps(log)
+    if update_github_file("joy_log.json", content, "Update joy log"):
+        # Saved version is the freshest — no need to refetch it
+        _set_joy_log_cache(log, events)
+        return True
+    return False
 
 
 def log_joy(category: str, item: str = None) -> bool:
     """Log a joy event with timestamp and optional specific item."""
     if category not in JOY_CATEGORIES:
         return False
-    log = get_joy_log()
+    log, (timestamps, categories) = _load_joy_log()
+    now = datetime.now(TZ)
+    ts = now.timestamp()
     entry = {
         "category": category,
-        "timestamp": datetime.now(TZ).isoformat()
+        "timestamp": now.isoformat(),
+        "ts": ts,
     }
     if item:
         entry["item"] = item
-    log.append(entry)
-    return save_joy_log(log)
+    log = [*log, entry]
+
+    # Extend the event index instead of re-parsing the whole log (new entry is almost always last)
+    pos = bisect_right(timestamps, ts)
+    events = (
+        [*timestamps[:pos], ts, *timestamps[pos:]],
+        [*categories[:pos], category, *categories[pos:]],
+    )
+    return save_joy_log(log, events)
 
 
 def get_joy_stats_week() -> dict:
     """Get joy statistics for the last 7 days."""
-    log = get_joy_log()
-    now = datetime.now(TZ)
-    week_ago = now - timedelta(days=7)
+    _, (timestamps, categories) = _load_joy_log()
+    cutoff = (datetime.now(TZ) - timedelta(days=7)).timestamp()
 
+    # Events are sorted by time — only the tail after the cutoff is scanned
     stats = {cat: 0 for cat in JOY_CATEGORIES}
-    for entry in log:
-        try:
-            ts = datetime.fromisoformat(entry["timestamp"])
-            if ts.tzinfo is None:
-                ts = ts.replace(tzinfo=TZ)
-            if ts >= week_ago:
-                cat = entry.get("category")
-                if cat in stats:
-                    stats[cat] += 1
-        except:
-            continue
+    for cat in categories[bisect_left(timestamps, cutoff):]:
+        if cat in stats:
+            stats[cat] += 1
     return stats
@@ -1,78 +1,93 @@
+from functools import lru_cache
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
-from config import ZONE_EMOJI, PROJECT_EMOJI, ALL_DESTINATIONS, JOY_CATEGORIES, JOY_CATEGORY_EMOJI
-from tasks import _parse_sensory_menu
+from config import ZONE_EMOJI, PROJECT_EMOJI, ALL_DESTINATIONS, JOY_CATEGORIES
+from tasks import get_joy_items
 
+# Клавиатуры без изменяемых данных строятся один раз и переиспользуются
+# (объекты telegram неизменяемы) — через @lru_cache на функциях ниже.
 
-def get_task_confirm_keyboard(task_index: int, suggested: str) -> InlineKeyboardMarkup:
-    """Keyboard for confirming task destination (zone or project)."""
-    # First row: confirm suggestion
+# Зоны и проекты фиксированы на время жизни процесса
+_ZONE_ITEMS = tuple(ZONE_EMOJI.items())
+_PROJECT_ITEMS = tuple(PROJECT_EMOJI.items())
+
+
+@lru_cache(maxsize=32)
+def _task_confirm_layout(suggested: str) -> tuple:
+    """Rows of (label, destination) for get_task_confirm_keyboard — depend only on suggested."""
     emoji = ALL_DESTINATIONS.get(suggested, "📋")
-    keyboard = [
-        [InlineKeyboardButton(f"✅ {emoji} {suggested.capitalize()}", callback_data=f"taskzone_{task_index}_{suggested}")],
-    ]
+    rows = [((f"✅ {emoji} {suggested.capitalize()}", suggested),)]
 
     # Zones row (excluding suggested)
-    other_zones = [z for z in ZONE_EMOJI.keys() if z != suggested]
-    row = []
-    for zone in other_zones:
-        e = ZONE_EMOJI[zone]
-        row.append(InlineKeyboardButton(f"{e}", callback_data=f"taskzone_{task_index}_{zone}"))
-    keyboard.append(row)
+    rows.append(tuple((e, zone) for zone, e in _ZONE_ITEMS if zone != suggested))
 
-    # Projects row (excluding suggested)
-    other_projects = [p for p in PROJECT_EMOJI.keys() if p != suggested]
-    row = []
-    for proj in other_projects[:4]:  # max 4 per row
-        e = PROJECT_EMOJI[proj]
-        row.append(InlineKeyboardButton(f"{e}", callback_data=f"taskzone_{task_index}_{proj}"))
-    keyboard.append(row)
+    # Projects rows (excluding suggested), max 4 per row
+    other_projects = tuple((e, proj) for proj, e in _PROJECT_ITEMS if proj != suggested)
+    rows.append(other_projects[:4])
     if len(other_projects) > 4:
-        row = []
-        for proj in other_projects[4:]:
-            e = PROJECT_EMOJI[proj]
-            row.append(InlineKeyboardButton(f"{e}", callback_data=f"taskzone_{task_index}_{proj}"))
-        keyboard.append(row)
+        rows.append(other_projects[4:])
 
     # Skip button
-    keyboard.append([InlineKeyboardButton("⏭ Пропустить", callback_data=f"taskzone_{task_index}_skip")])
+    rows.append((("⏭ Пропустить", "skip"),))
+    return tuple(rows)
 
-    return InlineKeyboardMarkup(keyboard)
 
+def get_task_confirm_keyboard(task_index: int, suggested: str) -> InlineKeyboardMarkup:
+    """Keyboard for confirming task destination (zone or project)."""
+    prefix = f"taskzone_{task_index}_"
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(label, callback_data=prefix + key) for label, key in row]
+        for row in _task_confirm_layout(suggested)
+    ])
 
-def get_destination_keyboard(callback_prefix: str = "adddest_") -> InlineKeyboardMarkup:
-    """Keyboard for choosing zone or project as task destination.
 
-    callback_prefix allows reuse for different flows (adddest_ for /add, taskzone_ for button Add).
-    """
-    keyboard = []
+@lru_cache(maxsize=None)
+def _destination_buttons(callback_prefix: str) -> tuple:
+    """(zone buttons, project buttons) with full labels — shared by destination pickers."""
+    zones = tuple(
+        InlineKeyboardButton(f"{emoji} {name.capitalize()}", callback_data=f"{callback_prefix}{name}")
+        for name, emoji in _ZONE_ITEMS
+    )
+    projects = tuple(
+        InlineKeyboardButton(f"{emoji} {name.replace('-', ' ').capitalize()}", callback_data=f"{callback_prefix}{name}")
+        for name, emoji in _PROJECT_ITEMS
+    )
+    return zones, projects
 
-    # Row 1: main zones (3 per row)
-    zones = list(ZONE_EMOJI.items())
-    row = []
-    for name, emoji in zones[:3]:
-        row.append(InlineKeyboardButton(f"{emoji} {name.capitalize()}", callback_data=f"{callback_prefix}{name}"))
-    keyboard.append(row)
 
-    row = []
-    for name, emoji in zones[3:]:
-        row.append(InlineKeyboardButton(f"{emoji} {name.capitalize()}", callback_data=f"{callback_prefix}{name}"))
-    keyboard.append(row)
+def _pairs(buttons: tuple) -> list:
+    return [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+
 
-    # Separator label
-    keyboard.append([InlineKeyboardButton("— Проекты —", callback_data="noop")])
+@lru_cache(maxsize=None)
+def get_destination_keyboard(callback_prefix: str = "adddest_") -> InlineKeyboardMarkup:
+    """Keyboard for choosing zone or project as task destination.
 
+    callback_prefix allows reuse for different flows (adddest_ for /add, taskzone_ for button Add).
+    """
+    zones, projects = _destination_buttons(callback_prefix)
+    keyboard = [
+        # Main zones (3 per row)
+        zones[:3],
+        zones[3:],
+        # Separator label
+        [InlineKeyboardButton("— Проекты —", callback_data="noop")],
+    ]
     # Projects (2 per row)
-    projects = list(PROJECT_EMOJI.items())
-    for i in range(0, len(projects), 2):
-        row = []
-        for name, emoji in projects[i:i+2]:
-            short_name = name.replace("-", " ").capitalize()
-            row.append(InlineKeyboardButton(f"{emoji} {short_name}", callback_data=f"{callback_prefix}{name}"))
-        keyboard.append(row)
+    keyboard.extend(_pairs(projects))
+    return InlineKeyboardMarkup(keyboard)
+
 
+@lru_cache(maxsize=None)
+def get_save_zone_keyboard() -> InlineKeyboardMarkup:
+    """Keyboard for changing zone/project of a task suggested by the LLM (2 per row + cancel)."""
+    zones, projects = _destination_buttons("zone_")
+    keyboard = _pairs(zones) + _pairs(projects)
+    keyboard.append([InlineKeyboardButton("Отмена", callback_data="save_cancel")])
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
 def get_priority_keyboard(callback_prefix: str = "addpri_") -> InlineKeyboardMarkup:
     """Inline keyboard for priority selection."""
     keyboard = [
@@ -88,6 +103,24 @@ def get_priority_keyboard(callback_prefix: str = "addpri_") -> InlineKeyboardMar
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
+def get_reminder_recurrence_keyboard() -> InlineKeyboardMarkup:
+    """Inline keyboard: повторять ли напоминание."""
+    keyboard = [
+        [
+            InlineKeyboardButton("Один раз", callback_data="remrec_once"),
+            InlineKeyboardButton("Каждый день", callback_data="remrec_daily"),
+        ],
+        [
+            InlineKeyboardButton("По будням", callback_data="remrec_weekdays"),
+            InlineKeyboardButton("Раз в неделю", callback_data="remrec_weekly"),
+        ],
+        [InlineKeyboardButton("Отмена", callback_data="remtime_cancel")],
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+
+@lru_cache(maxsize=None)
 def get_main_keyboard(mode: str = "geek"):
     """Главная клавиатура."""
     keyboard = [
@@ -104,6 +137,7 @@ def get_main_keyboard(mode: str = "geek"):
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
 def get_reply_keyboard():
     """Постоянная клавиатура внизу чата."""
     keyboard = [
@@ -113,6 +147,7 @@ def get_reply_keyboard():
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
 
 
+@lru_cache(maxsize=None)
 def get_add_keyboard():
     """Inline keyboard для выбора: Task или Note."""
     keyboard = [[
@@ -122,6 +157,7 @@ def get_add_keyboard():
     return InlineKeyboardMarkup(keyboard)
 
 
+@lru_cache(maxsize=None)
 def get_note_mode_keyboard():
     """Inline keyboard для режима заметки."""
     keyboard = [[
@@ -162,6 +198,7 @@ BINGO_ITEMS = [
 ]
 
 
+@lru_cache(maxsize=None)
 def get_sensory_keyboard():
     """Inline keyboard for sensory state selection."""
     keyboard = [
@@ -177,16 +214,34 @@ def get_sensory_keyboard():
     return InlineKeyboardMarkup(keyboard)
 
 
+# Кнопки бинго собраны один раз: на каждый тап меняется только выбор ☑️/⬜ по индексу
+_BINGO_BTN_OFF = tuple(
+    InlineKeyboardButton(f"⬜ {item}", callback_data=f"sensory_bad_toggle_{i}")
+    for i, item in enumerate(BINGO_ITEMS)
+)
+_BINGO_BTN_ON = tuple(
+    InlineKeyboardButton(f"☑️ {item}", callback_data=f"sensory_bad_toggle_{i}")
+    for i, item in enumerate(BINGO_ITEMS)
+)
+_BINGO_SUBMIT_ROW = (InlineKeyboardButton("🔍 investigate", callback_data="sensory_bad_submit"),)
+
+
+@lru_cache(maxsize=64)
+def _sensory_bad_markup(selected: frozenset) -> InlineKeyboardMarkup:
+    rows = [
+        (_BINGO_BTN_ON[i] if i in selected else _BINGO_BTN_OFF[i],)
+        for i in range(len(BINGO_ITEMS))
+    ]
+    rows.append(_BINGO_SUBMIT_ROW)
+    return InlineKeyboardMarkup(rows)
+
+
 def get_sensory_bad_keyboard(selected: set):
     """Inline keyboard for the 'Плохо' bingo checklist."""
-    keyboard = []
-    for i, item in enumerate(BINGO_ITEMS):
-        prefix = "☑️" if i in selected else "⬜"
-        keyboard.append([InlineKeyboardButton(f"{prefix} {item}", callback_data=f"sensory_bad_toggle_{i}")])
-    keyboard.append([InlineKeyboardButton("🔍 investigate", callback_data="sensory_bad_submit")])
-    return InlineKeyboardMarkup(keyboard)
+    return _sensory_bad_markup(frozenset(selected))
 
 
+@lru_cache(maxsize=None)
 def get_joy_keyboard():
     """Inline keyboard for joy category selection."""
     keyboard = [
@@ -207,35 +262,19 @@ def get_joy_keyboard():
 
 def get_joy_items_keyboard(category: str) -> InlineKeyboardMarkup:
     """Inline keyboard with specific items for a joy category."""
-    menu = _parse_sensory_menu()
-    emoji = JOY_CATEGORY_EMOJI.get(category, "✨")
-
-    # Map joy categories to sensory menu keys
-    category_map = {
-        "sensory": ["inputs", "emergency", "unfreeze"],  # Combine all sensory
-        "creativity": ["creativity"],
-        "media": ["media"],
-        "connection": ["connection"]
-    }
-
-    items = []
-    for key in category_map.get(category, []):
-        items.extend(menu.get(key, []))
-
-    # Create buttons - max 2 per row, truncate long items
-    keyboard = []
-    row = []
-    for i, item in enumerate(items[:10]):  # Limit to 10 items
-        # Truncate item name for button (max ~25 chars)
-        short_item = item[:22] + "..." if len(item) > 25 else item
-        # callback_data max 64 bytes, use index
-        callback = f"joyitem_{category}_{i}"
-        row.append(InlineKeyboardButton(short_item, callback_data=callback))
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
+    return _joy_items_markup(category, tuple(get_joy_items(category)[:10]))  # Limit to 10 items
+
+
+@lru_cache(maxsize=16)
+def _joy_items_markup(category: str, items: tuple) -> InlineKeyboardMarkup:
+    # Пока sensory menu не меняется, подписи и кнопки строятся один раз на категорию
+    buttons = [
+        # Truncate item name for button (max ~25 chars); callback_data max 64 bytes, use index
+        InlineKeyboardButton(item[:22] + "..." if len(item) > 25 else item, callback_data=f"joyitem_{category}_{i}")
+        for i, item in enumerate(items)
+    ]
+    # Max 2 per row
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
 
     # Add "Другое" button and back button
     keyboard.append([
@@ -272,6 +311,7 @@ def food_is_food_keyboard(entry_id: str = "0") -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=None)
 def food_save_custom_keyboard() -> InlineKeyboardMarkup:
     """Keyboard: offer to save as frequent/custom dish."""
     return InlineKeyboardMarkup([
@@ -312,6 +352,7 @@ def food_quick_keyboard(custom_dishes: dict) -> InlineKeyboardMarkup:
 
 # ── NS Check-in ──────────────────────────────────────────────────────
 
+@lru_cache(maxsize=None)
 def ns_checkin_keyboard() -> InlineKeyboardMarkup:
     """Evening NS check-in: how is the nervous system today?"""
     return InlineKeyboardMarkup([
@@ -326,6 +367,7 @@ def ns_checkin_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=None)
 def ns_helped_keyboard() -> InlineKeyboardMarkup:
     """Follow-up: what helped? (shown after meh/bad/spasm)."""
     return InlineKeyboardMarkup([
@@ -342,3 +384,18 @@ def ns_helped_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton("Ничего", callback_data="nsh_nothing"),
         ],
     ])
+
+
+@lru_cache(maxsize=None)
+def whoop_morning_keyboard() -> InlineKeyboardMarkup:
+    """Morning WHOOP message: how do you feel?"""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("Отлично", callback_data="morning_great"),
+            InlineKeyboardButton("Норм", callback_data="morning_ok"),
+        ],
+        [
+            InlineKeyboardButton("Устала", callback_data="morning_tired"),
+            InlineKeyboardButton("Плохо", callback_data="morning_bad"),
+        ],
+    ])
@@ -1,19 +1,36 @@
+import re
 import random
+import string
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from google import genai
+from functools import lru_cache
+from google.genai import types
 from config import (
     gemini_client, openai_client,
     GEMINI_MODEL, GEMINI_PRO_MODEL, OPENAI_MODEL,
     TZ, logger, USER_CONTEXT_FILE,
 )
 from prompts import GEEK_PROMPT
-from storage import load_file, get_writing_file
+from storage import load_file_cached, get_writing_file
 from tasks import get_life_tasks
-from whoop import whoop_client
+from whoop import whoop_client, compute_recovery_summary
 
 
-# Cache for motivations (loaded once)
-_motivations_cache = None
+# GEEK_PROMPT разобран один раз: (литерал, имя поля) — на вызов остаётся подстановка и join
+_GEEK_PROMPT_PARTS = tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(GEEK_PROMPT))
+
+
+def _render(parts: tuple, values: dict) -> str:
+    """Собрать промпт из предразобранного шаблона (только простые поля {name}, без format spec)."""
+    return "".join(literal + (str(values[field]) if field is not None else "") for literal, field in parts)
+
+
+# Роль сообщения истории → роль Gemini (всё, что не user, — ответ модели)
+_GEMINI_ROLES = {"user": "user", "assistant": "model", "system": "model"}
+
+# Потоки для параллельных запросов к WHOOP в _get_whoop_context (по одному на endpoint)
+_whoop_context_pool = ThreadPoolExecutor(max_workers=5, thread_name_prefix="whoop_ctx")
 
 
 def _is_truncated(response) -> bool:
@@ -24,6 +41,13 @@ def _is_truncated(response) -> bool:
     return 'MAX_TOKENS' in str(finish).upper() if finish else False
 
 
+def _finish_reason(response):
+    """finish_reason первого кандидата — только для логов (не считаем на успешном пути)."""
+    if not response.candidates:
+        return "NO_CANDIDATES"
+    return getattr(response.candidates[0], "finish_reason", "UNKNOWN")
+
+
 def _continue_generation(client, model: str, system: str, original_contents: list,
                          initial_text: str, max_tokens: int, max_continuations: int = 3) -> str:
     """Continue generating when Gemini response was truncated.
@@ -35,20 +59,20 @@ def _continue_generation(client, model: str, system: str, original_contents: lis
 
     for i in range(max_continuations):
         cont_contents = list(original_contents)
-        cont_contents.append(genai.types.Content(
+        cont_contents.append(types.Content(
             role="model",
-            parts=[genai.types.Part(text=full_text)]
+            parts=[types.Part(text=full_text)]
         ))
-        cont_contents.append(genai.types.Content(
+        cont_contents.append(types.Content(
             role="user",
-            parts=[genai.types.Part(text="Продолжай с того места, где остановился. Не повторяй уже написанное.")]
+            parts=[types.Part(text="Продолжай с того места, где остановился. Не повторяй уже написанное.")]
         ))
 
         try:
             cont_response = client.models.generate_content(
                 model=model,
                 contents=cont_contents,
-                config=genai.types.GenerateContentConfig(
+                config=types.GenerateContentConfig(
                     system_instruction=system,
                     max_output_tokens=max_tokens,
                 ),
@@ -69,70 +93,84 @@ def _continue_generation(client, model: str, system: str, original_contents: lis
     return full_text
 
 
+@lru_cache(maxsize=None)
 def get_motivations() -> str:
-    """Get motivations from Writing repo context/motivations.md. Cached."""
-    global _motivations_cache
-    if _motivations_cache is not None:
-        return _motivations_cache
-
+    """Get motivations from Writing repo context/motivations.md. Loaded once per process."""
     content = get_writing_file("context/motivations.md")
     if content:
-        _motivations_cache = content
         logger.info("Loaded motivations from Writing repo")
-    else:
-        _motivations_cache = ""
-        logger.warning("Failed to load motivations")
-    return _motivations_cache
+        return content
+    logger.warning("Failed to load motivations")
+    return ""
+
+
+# Заголовок секции motivations.md → ключ списка цитат
+_MOTIVATION_SECTIONS = {
+    "## Восстановительный режим": "recovery",
+    "## Умеренный режим": "moderate",
+    "## После \"Отлично\"": "feeling_good",
+    "## После \"Норм\"": "feeling_good",
+    "## После \"Устала\"": "feeling_bad",
+    "## После \"Плохо\"": "feeling_bad",
+    "## Про сон": "sleep",
+    "## Про бокс": "exercise",
+    "## Похвала за сон": "sleep_praise",
+    "## Похвала за бокс": "exercise_praise",
+    "## Похвала за тренировку": "exercise_praise",
+}
+
+
+def _motivation_section(header: str) -> str | None:
+    """Ключ секции по строке заголовка: точное совпадение, иначе по префиксу ("## Про сон (…)")."""
+    key = _MOTIVATION_SECTIONS.get(header.rstrip())
+    if key is None:
+        key = next((k for prefix, k in _MOTIVATION_SECTIONS.items() if header.startswith(prefix)), None)
+    return key
+
+
+@lru_cache(maxsize=1)
+def _parse_motivations(content: str) -> dict:
+    """Разобрать motivations.md один раз: {ключ секции: [цитаты]}."""
+    sections = {key: [] for key in _MOTIVATION_SECTIONS.values()}
+    current = None
+    for line in content.splitlines():
+        if line.startswith("## "):
+            current = _motivation_section(line)
+        elif current and line.startswith("> "):
+            sections[current].append(line[2:].strip())
+    return sections
+
+
+# Свой генератор для выбора цитат (без обращения к общему состоянию модуля random)
+_rng = random.Random()
+
+
+def _pick_quotes(result: list, low: bool, quotes: list, praise: list, k: int) -> None:
+    """Мало (low) → до k цитат-напоминаний, иначе одна похвала. Пустой пул — ничего."""
+    if low:
+        if quotes:
+            result.extend(_rng.sample(quotes, min(k, len(quotes))))
+    elif praise:
+        result.append(_rng.choice(praise))
 
 
 def get_motivations_for_whoop(sleep_hours: float, strain: float) -> str:
     """Get relevant motivations based on WHOOP data. Returns 2-3 quotes."""
-    import random
     content = get_motivations()
     if not content:
         return ""
 
-    lines = content.split("\n")
-    sleep_quotes = []
-    exercise_quotes = []
-    sleep_praise = []
-    exercise_praise = []
-
-    current_section = None
-    for line in lines:
-        if line.startswith("## Про сон"):
-            current_section = "sleep"
-        elif line.startswith("## Про бокс"):
-            current_section = "exercise"
-        elif line.startswith("## Похвала за сон"):
-            current_section = "sleep_praise"
-        elif line.startswith("## Похвала за бокс") or line.startswith("## Похвала за тренировку"):
-            current_section = "exercise_praise"
-        elif line.startswith("## "):
-            current_section = None
-        elif line.startswith("> ") and current_section:
-            quote = line[2:].strip()
-            if current_section == "sleep":
-                sleep_quotes.append(quote)
-            elif current_section == "exercise":
-                exercise_quotes.append(quote)
-            elif current_section == "sleep_praise":
-                sleep_praise.append(quote)
-            elif current_section == "exercise_praise":
-                exercise_praise.append(quote)
+    sections = _parse_motivations(content)
+    sleep_quotes = sections["sleep"]
+    exercise_quotes = sections["exercise"]
+    sleep_praise = sections["sleep_praise"]
+    exercise_praise = sections["exercise_praise"]
 
     result = []
 
     # Pick based on data
-    if sleep_hours < 7 and sleep_quotes:
-        result.extend(random.sample(sleep_quotes, min(2, len(sleep_quotes))))
-    elif sleep_hours >= 7 and sleep_praise:
-        result.append(random.choice(sleep_praise))
-
-    if strain < 5 and exercise_quotes:
-        result.extend(random.sample(exercise_quotes, min(2, len(exercise_quotes))))
-    elif strain >= 5 and exercise_praise:
-        result.append(random.choice(exercise_praise))
+    _pick_quotes(result, sleep_hours < 7, sleep_quotes, sleep_praise, k=2)
+    _pick_quotes(result, strain < 5, exercise_quotes, exercise_praise, k=2)
 
     return "\n\n".join(result) if result else ""
 
@@ -149,78 +187,29 @@ def get_motivations_for_mode(mode: str, sleep_hours: float, strain: float, recov
     Returns:
         2-3 motivation quotes for LLM to adapt
     """
-    import random
     content = get_motivations()
     if not content:
         return ""
 
-    lines = content.split("\n")
-    recovery_quotes = []
-    moderate_quotes = []
-    sleep_quotes = []
-    sleep_praise = []
-    exercise_quotes = []
-    exercise_praise = []
-    feeling_good = []
-    feeling_bad = []
-
-    current_section = None
-    for line in lines:
-        if line.startswith("## Восстановительный режим"):
-            current_section = "recovery"
-        elif line.startswith("## Умеренный режим"):
-            current_section = "moderate"
-        elif line.startswith("## После \"Отлично\"") or line.startswith("## После \"Норм\""):
-            current_section = "feeling_good"
-        elif line.startswith("## После \"Устала\"") or line.startswith("## После \"Плохо\""):
-            current_section = "feeling_bad"
-        elif line.startswith("## Про сон"):
-            current_section = "sleep"
-        elif line.startswith("## Про бокс"):
-            current_section = "exercise"
-        elif line.startswith("## Похвала за сон"):
-            current_section = "sleep_praise"
-        elif line.startswith("## Похвала за тренировку"):
-            current_section = "exercise_praise"
-        elif line.startswith("## "):
-            current_section = None
-        elif line.startswith("> ") and current_section:
-            quote = line[2:].strip()
-            if current_section == "recovery":
-                recovery_quotes.append(quote)
-            elif current_section == "moderate":
-                moderate_quotes.append(quote)
-            elif current_section == "feeling_good":
-                feeling_good.append(quote)
-            elif current_section == "feeling_bad":
-                feeling_bad.append(quote)
-            elif current_section == "sleep":
-                sleep_quotes.append(quote)
-            elif current_section == "sleep_praise":
-                sleep_praise.append(quote)
-            elif current_section == "exercise":
-                exercise_quotes.append(quote)
-            elif current_section == "exercise_praise":
-                exercise_praise.append(quote)
+    sections = _parse_motivations(content)
+    recovery_quotes = sections["recovery"]
+    moderate_quotes = sections["moderate"]
+    sleep_quotes = sections["sleep"]
+    sleep_praise = sections["sleep_praise"]
+    exercise_quotes = sections["exercise"]
+    exercise_praise = sections["exercise_praise"]
 
     result = []
 
     # Mode-specific quotes
     if mode == "recovery" and recovery_quotes:
-        result.extend(random.sample(recovery_quotes, min(2, len(recovery_quotes))))
+        result.extend(_rng.sample(recovery_quotes, min(2, len(recovery_quotes))))
     elif mode == "moderate" and moderate_quotes:
-        result.extend(random.sample(moderate_quotes, min(2, len(moderate_quotes))))
+        result.extend(_rng.sample(moderate_quotes, min(2, len(moderate_quotes))))
     else:
         # Normal mode - use classic sleep/exercise logic
-        if sleep_hours < 7 and sleep_quotes:
-            result.append(random.choice(sleep_quotes))
-        elif sleep_hours >= 7 and sleep_praise:
-            result.append(random.choice(sleep_praise))
-
-        if strain < 5 and exercise_quotes:
-            result.append(random.choice(exercise_quotes))
-        elif strain >= 5 and exercise_praise:
-            result.append(random.choice(exercise_praise))
+        _pick_quotes(result, sleep_hours < 7, sleep_quotes, sleep_praise, k=1)
+        _pick_quotes(result, strain < 5, exercise_quotes, exercise_praise, k=1)
 
     return "\n\n".join(result) if result else ""
 
@@ -258,12 +247,18 @@ _HEALTH_KEYWORDS = {
     "здоровье", "тело", "перетренированность", "спорт",
     "сердце", "давление", "рекавери", "стрейн",
 }
+# Все ключевые слова одним регэкспом: один проход по сообщению вместо scan на каждое слово
+_HEALTH_RE = re.compile(
+    "|".join(re.escape(kw) for kw in sorted(_HEALTH_KEYWORDS, key=len, reverse=True)),
+    re.IGNORECASE,
+)
 
 
 def _is_health_topic(message: str) -> bool:
     """Check if user message is about health/fitness/WHOOP topics."""
-    lower = message.lower()
-    return any(kw in lower for kw in _HEALTH_KEYWORDS)
+    # Один регэксп на обе раскладки: сообщения смешанные ("мой HRV", "после boxing"),
+    # деление по алфавиту пропускало бы такие совпадения
+    return _HEALTH_RE.search(message) is not None
 
 
 async def get_llm_response(user_message: str, mode: str = "geek", history: list = None, max_tokens: int = 800, skip_context: bool = False, custom_system: str = None, use_pro: bool = False, no_continue: bool = False) -> str:
@@ -283,11 +278,19 @@ async def get_llm_response(user_message: str, mode: str = "geek", history: list
             tasks = ""
             whoop_data = ""
         else:
-            tasks = get_life_tasks()
-            whoop_data = _get_whoop_context()
+            # Задачи и WHOOP — независимые блокирующие источники, грузим параллельно
+            tasks, whoop_data = await asyncio.gather(
+                asyncio.to_thread(get_life_tasks),
+                asyncio.to_thread(_get_whoop_context),
+            )
 
-        user_context = load_file(USER_CONTEXT_FILE, "Профиль не настроен.")
-        system = GEEK_PROMPT.format(user_context=user_context, current_time=current_time, tasks=tasks, whoop_data=whoop_data)
+        user_context = load_file_cached(USER_CONTEXT_FILE, "Профиль не настроен.")
+        system = _render(_GEEK_PROMPT_PARTS, {
+            "user_context": user_context,
+            "current_time": current_time,
+            "tasks": tasks,
+            "whoop_data": whoop_data,
+        })
 
     # Собираем контекст диалога
     if history is None:
@@ -300,41 +303,43 @@ async def get_llm_response(user_message: str, mode: str = "geek", history: list
     if gemini_client:
         try:
             # Gemini: передаём историю как список сообщений
-            gemini_contents = []
-            for msg in history:
-                gemini_contents.append(genai.types.Content(
-                    role="user" if msg["role"] == "user" else "model",
-                    parts=[genai.types.Part(text=msg["content"])]
-                ))
-            gemini_contents.append(genai.types.Content(
+            gemini_contents = [
+                types.Content(
+                    role=_GEMINI_ROLES.get(msg["role"], "model"),
+                    parts=[types.Part(text=msg["content"])],
+                )
+                for msg in history
+            ]
+            gemini_contents.append(types.Content(
                 role="user",
-                parts=[genai.types.Part(text=user_message)]
+                parts=[types.Part(text=user_message)]
             ))
 
             response = gemini_client.models.generate_content(
                 model=model,
                 contents=gemini_contents,
-                config=genai.types.GenerateContentConfig(
+                config=types.GenerateContentConfig(
                     system_instruction=system,
                     max_output_tokens=max_tokens,
                 ),
             )
-            if response.text:
-                finish = getattr(response.candidates[0], 'finish_reason', 'UNKNOWN') if response.candidates else 'NO_CANDIDATES'
-                logger.info(f"Gemini response OK ({model}), finish_reason={finish}, len={len(response.text)}")
+            # .text собирается из parts при каждом обращении — читаем один раз
+            text = response.text
+            if text:
+                logger.info(f"Gemini response OK ({model}), len={len(text)}")
 
                 # Auto-continue if response was truncated (skip if no_continue=True)
                 if _is_truncated(response) and not no_continue:
-                    logger.warning(f"Gemini response truncated (finish_reason={finish}), auto-continuing...")
+                    logger.warning(f"Gemini response truncated (finish_reason={_finish_reason(response)}), auto-continuing...")
                     full_text = _continue_generation(
                         gemini_client, model, system, gemini_contents,
-                        response.text, max_tokens,
+                        text, max_tokens,
                     )
                     return full_text
 
-                return response.text
+                return text
             else:
-                finish = getattr(response.candidates[0], 'finish_reason', 'UNKNOWN') if response.candidates else 'NO_CANDIDATES'
+                finish = _finish_reason(response)
                 logger.warning(f"Gemini {model} returned empty response, finish_reason={finish}, falling back to OpenAI")
         except Exception as e:
             logger.warning(f"Gemini API error, falling back to OpenAI: {e}")
@@ -362,8 +367,20 @@ async def get_llm_response(user_message: str, mode: str = "geek", history: list
 def _get_whoop_context() -> str:
     """Get WHOOP data as context string for LLM prompts."""
     try:
+        # Endpoints are independent — fetch them concurrently (each is cached in whoop_client)
+        futures = [
+            _whoop_context_pool.submit(getter)
+            for getter in (
+                whoop_client.get_recovery_today,
+                whoop_client.get_sleep_today,
+                whoop_client.get_cycle_today,
+                whoop_client.get_workouts_today,
+                whoop_client.get_recovery_week,
+            )
+        ]
+        rec, sleep, cycle, workouts, week = (f.result() for f in futures)
+
         parts = []
-        rec = whoop_client.get_recovery_today()
         if rec:
             score = rec.get("score", {})
             rs = score.get("recovery_score")
@@ -377,7 +394,6 @@ def _get_whoop_context() -> str:
             if hrv is not None:
                 parts.append(f"HRV: {round(hrv, 1)} ms")
 
-        sleep = whoop_client.get_sleep_today()
         if sleep:
             ss = sleep.get("score", {})
             stage = ss.get("stage_summary", {})
@@ -400,13 +416,11 @@ def _get_whoop_context() -> str:
                     parts.append(f"Sleep debt: {whoop_client.format_hours_min(debt_h)}")
 
         # Strain
-        cycle = whoop_client.get_cycle_today()
         if cycle:
             strain = round(cycle.get("score", {}).get("strain", 0), 1)
             parts.append(f"Strain: {strain}")
 
         # Workouts
-        workouts = whoop_client.get_workouts_today()
         if workouts:
             wo_names = [wo.get("sport_name", "?") for wo in workouts]
             parts.append(f"Тренировки сегодня: {', '.join(wo_names)}")
@@ -414,14 +428,11 @@ def _get_whoop_context() -> str:
             parts.append("Тренировки сегодня: нет")
 
         # Weekly averages
-        week = whoop_client.get_recovery_week()
         if week:
-            scores = [r.get("score", {}).get("recovery_score") for r in week if r.get("score", {}).get("recovery_score") is not None]
-            if scores:
-                avg = round(sum(scores) / len(scores))
-                green = sum(1 for s in scores if s >= 67)
-                red = sum(1 for s in scores if s < 34)
-                parts.append(f"Recovery за неделю: avg {avg}% (green {green}/7, red {red}/7)")
+            stats = compute_recovery_summary(week)
+            if stats["recovery_avg"] is not None:
+                avg = round(stats["recovery_avg"])
+                parts.append(f"Recovery за неделю: avg {avg}% (green {stats['green']}/7, red {stats['red']}/7)")
 
         if parts:
             return "\n".join(parts)
@@ -4,20 +4,25 @@ Data mirrors family health/kitchen.md in Obsidian.
 """
 
 import random
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-ALL = {"А", "Н", "Т", "К"}
+# Наборы едоков — общие неизменяемые объекты на все блюда
+ALL = frozenset({"А", "Н", "Т", "К"})
+ALL_BUT_N = ALL - {"Н"}
+ALL_BUT_T = ALL - {"Т"}
+A_AND_K = frozenset({"А", "К"})
+ONLY_A = frozenset({"А"})
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Meal:
     name: str
     category: str  # "белок", "гарнир", "овощи", "целое", "личное_А"
-    eaters: set
-    ingredients: list
+    eaters: frozenset
+    ingredients: list = field(hash=False)  # список не хэшируется — в hash не участвует
     kcal: int = 0
     protein: int = 0
     fat: int = 0
@@ -27,7 +32,7 @@ class Meal:
 # === БЕЛКОВОЕ ===
 
 PROTEINS = [
-    Meal("Покупной холодец", "белок", ALL - {"Н"},
+    Meal("Покупной холодец", "белок", ALL_BUT_N,
          ["холодец"], 180, 20, 10, 0),
     Meal("Котлеты", "белок", ALL,
          ["фарш", "лук", "хлеб", "яйцо"], 220, 15, 15, 8),
@@ -58,9 +63,9 @@ PROTEINS = [
 # === ГАРНИР ===
 
 SIDES = [
-    Meal("Гречка", "гарнир", ALL - {"Т"},
+    Meal("Гречка", "гарнир", ALL_BUT_T,
          ["гречка"], 130, 4, 1, 25),
-    Meal("Рис", "гарнир", ALL - {"Т"},
+    Meal("Рис", "гарнир", ALL_BUT_T,
          ["рис"], 130, 3, 0, 28),
     Meal("Картошка запечённая", "гарнир", ALL,
          ["картофель", "масло"], 150, 2, 5, 25),
@@ -96,7 +101,7 @@ COMPLETE_MEALS = [
          ["чечевица", "лук", "морковь", "специи"], 200, 12, 3, 30),
     Meal("Пельмени", "целое", ALL,
          ["пельмени"], 280, 12, 12, 30),
-    Meal("Салат из тунца", "целое", {"А", "К"},
+    Meal("Салат из тунца", "целое", A_AND_K,
          ["тунец", "яйцо", "кукуруза", "майонез"], 220, 18, 12, 10),
     Meal("Суп Фо", "целое", ALL,
          ["лапша", "бульон", "говядина", "зелень"], 300, 18, 8, 35),
@@ -125,31 +130,31 @@ COMPLETE_MEALS = [
 # === ЛИЧНОЕ А ===
 
 PERSONAL_A_MEALS = [
-    Meal("Egg bites", "личное_А", {"А"},
+    Meal("Egg bites", "личное_А", ONLY_A,
          ["яйца", "творог", "йогурт", "зелень"], 150, 15, 8, 1),
-    Meal("Лобио домашнее", "личное_А", {"А"},
+    Meal("Лобио домашнее", "личное_А", ONLY_A,
          ["фасоль"], 270, 19, 0, 0),
-    Meal("THE бутер", "личное_А", {"А"},
+    Meal("THE бутер", "личное_А", ONLY_A,
          ["диетхлеб", "филе", "сулугуни", "кетчуп"], 144, 14, 4, 12),
-    Meal("Врап с пудингом", "личное_А", {"А"},
+    Meal("Врап с пудингом", "личное_А", ONLY_A,
          ["лаваш", "ванильный пудинг"], 115, 11, 0, 0),
-    Meal("Домашняя шаурма (1/2)", "личное_А", {"А"},
+    Meal("Домашняя шаурма (1/2)", "личное_А", ONLY_A,
          ["лаваш", "курица", "овощи"], 140, 14, 0, 0),
-    Meal("Ванильный пудинг", "личное_А", {"А"},
+    Meal("Ванильный пудинг", "личное_А", ONLY_A,
          ["молоко", "творог", "казеин"], 63, 8, 0, 0),
-    Meal("Свинина air fryer", "личное_А", {"А"},
+    Meal("Свинина air fryer", "личное_А", ONLY_A,
          ["свинина"], 190, 19, 0, 0),
-    Meal("Мои котлеты", "личное_А", {"А"},
+    Meal("Мои котлеты", "личное_А", ONLY_A,
          ["куриный фарш"], 110, 17, 4, 1),
-    Meal("Шаурма Tiflis", "личное_А", {"А"},
+    Meal("Шаурма Tiflis", "личное_А", ONLY_A,
          ["покупная шаурма"], 180, 3, 8, 23),
-    Meal("Салат с творогом", "личное_А", {"А"},
+    Meal("Салат с творогом", "личное_А", ONLY_A,
          ["творог", "зелень"], 120, 12, 3, 6),
-    Meal("My chiken wrap", "личное_А", {"А"},
+    Meal("My chiken wrap", "личное_А", ONLY_A,
          ["лаваш", "курица"], 128, 18, 10, 2),
-    Meal("Мой латте", "личное_А", {"А"},
+    Meal("Мой латте", "личное_А", ONLY_A,
          ["кофе", "молоко", "протеин"], 160, 21, 5, 35),
-    Meal("Protein banana bread", "личное_А", {"А"},
+    Meal("Protein banana bread", "личное_А", ONLY_A,
          ["банан", "протеин", "яйцо"], 148, 13, 6, 11),
 ]
 
@@ -159,13 +164,34 @@ PERSONAL_A_MEALS = [
 DAY_NAMES = ["Понедельник", "Вторник", "Среда", "Четверг",
              "Пятница", "Суббота", "Воскресенье"]
 
+# Пулы, не зависящие от выбора, считаются один раз при импорте (данные статичны)
+# Целые блюда, которые едят все (если таких нет — весь список)
+_FAMILY_COMPLETE = tuple(m for m in COMPLETE_MEALS if m.eaters == ALL) or tuple(COMPLETE_MEALS)
+# Белок → гарниры, подходящие всем его едокам (если таких нет — все гарниры)
+_COMPATIBLE_SIDES = {
+    p.name: tuple(s for s in SIDES if p.eaters <= s.eaters) or tuple(SIDES)
+    for p in PROTEINS
+}
+# Личные блюда А по убыванию белка (для suggest_what_to_eat)
+_A_MEALS_BY_PROTEIN = sorted(PERSONAL_A_MEALS, key=lambda m: m.protein, reverse=True)
+# Слоты, где можно заказать доставку: без воскресенья (бабушка) и ужина пятницы (шаурма)
+_DELIVERY_SLOTS = tuple(
+    (i, t) for i in range(6) for t in ("lunch", "dinner")
+    if not (i == 4 and t == "dinner")
+)
+
 
 def _pick_unique(pool: list, used: set) -> Meal:
     """Pick a meal from pool, preferring unused ones."""
+    # Случайная проба с отбрасыванием: равномерно среди неиспользованных и обычно
+    # попадает с первого раза — без сборки отфильтрованного списка на каждый вызов
+    for _ in range(len(pool)):
+        meal = random.choice(pool)
+        if meal.name not in used:
+            return meal
+    # Почти всё использовано — честный выбор по оставшимся (или по всему пулу)
     unused = [m for m in pool if m.name not in used]
-    if unused:
-        return random.choice(unused)
-    return random.choice(pool)
+    return random.choice(unused or pool)
 
 
 def _pick_family_meal(used_proteins, used_sides, used_complete):
@@ -174,20 +200,14 @@ def _pick_family_meal(used_proteins, used_sides, used_complete):
 
     if use_complete:
         # Prefer meals everyone eats
-        family_complete = [m for m in COMPLETE_MEALS if m.eaters == ALL]
-        if not family_complete:
-            family_complete = COMPLETE_MEALS
-        meal = _pick_unique(family_complete, used_complete)
+        meal = _pick_unique(_FAMILY_COMPLETE, used_complete)
         used_complete.add(meal.name)
         return meal.name
     else:
         p = _pick_unique(PROTEINS, used_proteins)
         used_proteins.add(p.name)
         # Pick side compatible with the protein's eaters
-        compatible_sides = [s for s in SIDES if p.eaters.issubset(s.eaters)]
-        if not compatible_sides:
-            compatible_sides = SIDES
-        s = _pick_unique(compatible_sides, used_sides)
+        s = _pick_unique(_COMPATIBLE_SIDES[p.name], used_sides)
         used_sides.add(s.name)
         parts = [p.name, s.name]
         # 35% chance to add a veggie
@@ -210,16 +230,8 @@ def generate_weekly_menu() -> str:
     used_personal = set()
 
     # Pick 1-2 delivery slots (not Friday dinner, not Sunday)
-    eligible = []
-    for i in range(7):
-        if i == 6:  # Sunday — бабушка
-            continue
-        eligible.append((i, "lunch"))
-        if i != 4:  # Friday dinner = шаурма
-            eligible.append((i, "dinner"))
-
     num_delivery = random.choice([1, 2])
-    delivery_slots = set(random.sample(eligible, min(num_delivery, len(eligible))))
+    delivery_slots = set(random.sample(_DELIVERY_SLOTS, min(num_delivery, len(_DELIVERY_SLOTS))))
 
     lines = ["МЕНЮ НА НЕДЕЛЮ", ""]
 
@@ -229,9 +241,7 @@ def generate_weekly_menu() -> str:
 
         # Sunday = бабушка
         if day_idx == 6:
-            lines.append(f"{day_name} {date_str}")
-            lines.append("  Бабушка приносит еду")
-            lines.append("")
+            lines.extend((f"{day_name} {date_str}", "  Бабушка приносит еду", ""))
             continue
 
         lines.append(f"{day_name} {date_str}")
@@ -273,7 +283,6 @@ def generate_weekly_menu() -> str:
 
 def suggest_what_to_eat(log_data: dict, today: str) -> str:
     """Suggest what to eat based on remaining daily targets."""
-    import random
     from config import DEFAULT_FOOD_TARGETS
 
     targets = log_data.get("daily_targets") or dict(DEFAULT_FOOD_TARGETS)
@@ -286,11 +295,10 @@ def suggest_what_to_eat(log_data: dict, today: str) -> str:
     remaining_protein = targets.get("protein", 130) - totals_protein
 
     # Sort by protein if protein is short, otherwise shuffle
-    pool = list(PERSONAL_A_MEALS)
     if remaining_protein > 30:
-        pool.sort(key=lambda m: m.protein, reverse=True)
+        pool = _A_MEALS_BY_PROTEIN
     else:
-        random.shuffle(pool)
+        pool = random.sample(PERSONAL_A_MEALS, len(PERSONAL_A_MEALS))
 
     # Filter to meals that fit remaining kcal (with 10% buffer)
     if remaining_kcal > 0:
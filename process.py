@@ -14,20 +14,28 @@
 import argparse
 import csv
 import json
+import math
 import os
+import re
 import sys
 import urllib.request
 from collections import defaultdict
+from contextlib import nullcontext
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 
-# === ХЕЛПЕР ДЛЯ ПОДДЕРЖКИ io.StringIO ===
+# === ХЕЛПЕР ДЛЯ ПОДДЕРЖКИ io.StringIO И СПИСКОВ СТРОК ===
 
 def _open_source(source, encoding="utf-8-sig"):
-    """Открыть файл (Path/str) или вернуть file-like object как есть."""
+    """
+    Открыть файл (Path/str) или обернуть уже готовый источник строк
+    (io.StringIO, список строк и т.д.).
+    """
     if isinstance(source, (str, Path)):
         return open(source, "r", encoding=encoding)
-    return source  # io.StringIO и т.д.
+    return nullcontext(source)
 
 
 def set_rates(rates):
@@ -142,11 +150,85 @@ def get_rate(currency, date_str):
 
 
 def to_rub(amount, currency, date_str):
-    """Конвертировать сумму в RUB."""
+    """Конвертировать сумму в RUB (рубли с копейками — формат amount_rub в processed CSV)."""
     rate = get_rate(currency, date_str)
     return round(amount * rate, 2)
 
 
+def _rub_totals(rows, key):
+    """{key(r): сумма amount_rub} — точная, через math.fsum по всем слагаемым группы."""
+    groups = defaultdict(list)
+    for r in rows:
+        groups[key(r)].append(r["amount_rub"])
+    return defaultdict(float, {k: math.fsum(v) for k, v in groups.items()})
+
+
+# Пробелы и кавычки вокруг значения поля CSV — снимаются одним strip
+_STRIP_CHARS = ' \t\r\n"'
+
+
+def _header_index(reader):
+    """Прочитать заголовок CSV: {имя колонки: индекс}."""
+    return {name: i for i, name in enumerate(next(reader, []))}
+
+
+def _cell(row, i, default=""):
+    """Сырое значение колонки i; default если колонки нет в заголовке или строка короче."""
+    if i is None or i >= len(row):
+        return default
+    return row[i]
+
+
+def _field(row, i, default=""):
+    """Значение колонки i строки CSV без окружающих пробелов и кавычек."""
+    return _cell(row, i, default).strip(_STRIP_CHARS)
+
+
+def _pattern_matcher(pairs):
+    """[(pattern, category)] → (регэксп «есть ли хоть один паттерн», pairs, exact).
+
+    Регэксп — быстрый отказ за один проход по строке; при попадании порядок
+    приоритета сохраняется: побеждает первый паттерн из категорий, как раньше.
+    exact — ответ для текста, целиком равного одному из паттернов (частый случай:
+    мерчант записан ровно как в категориях); посчитан по тем же правилам приоритета.
+    """
+    if not pairs:
+        return None, pairs, {}
+    exact = {}
+    for p, _ in pairs:
+        if p not in exact:
+            exact[p] = next(cat for q, cat in pairs if q in p)
+    return re.compile("|".join(re.escape(p) for p, _ in pairs)), pairs, exact
+
+
+def _match_category(matcher, text):
+    """Категория первого паттерна (в порядке категорий), входящего в text, иначе None."""
+    regex, pairs, exact = matcher
+    cat = exact.get(text)
+    if cat is not None:
+        return cat
+    if regex is None or regex.search(text) is None:
+        return None
+    for pattern, cat in pairs:
+        if pattern in text:
+            return cat
+    return None
+
+
+def _derived(section, key, build):
+    """
+    Производная структура секции categories (матчеры, множества), построенная один раз.
+
+    Хранится в самой секции под служебным ключом: категории грузятся один раз
+    на батч, а парсеры вызываются на каждый файл и период.
+    """
+    value = section.get(key)
+    if value is None:
+        value = section[key] = build(section)
+    return value
+
+
+@lru_cache(maxsize=4096)
 def strip_surname(description):
     """
     Убирает фамилию из description, оставляя только имя.
@@ -210,35 +292,49 @@ def parse_zen(filepath, categories, target_period):
     Строки с одинаковым (date, payee, outcome, income, outcomeAccount, incomeAccount) пропускаются.
     """
     rows = []
+    # Длина периода (YYYY или YYYY-MM) — фильтр по дате сравнивает префикс среза
+    period_len = len(target_period)
     cat_map_exp = categories["zen"]["expense"]
     cat_map_inc = categories["zen"]["income"]
     payee_exp_override = categories["zen"].get("payee_expense_override", {})
     seen = set()  # для дедупликации
 
     with _open_source(filepath, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f, delimiter=";")
+        # csv.reader + индексы колонок: без отдельного dict на каждую строку
+        reader = csv.reader(f, delimiter=";")
+        col = _header_index(reader)
+        date_i = col.get("date")
+        category_i = col.get("categoryName")
+        payee_i = col.get("payee")
+        comment_i = col.get("comment")
+        outcome_acc_i = col.get("outcomeAccountName")
+        outcome_i = col.get("outcome")
+        outcome_curr_i = col.get("outcomeCurrencyShortTitle")
+        income_acc_i = col.get("incomeAccountName")
+        income_i = col.get("income")
+        income_curr_i = col.get("incomeCurrencyShortTitle")
         for row in reader:
-            date_str = row.get("date", "").strip()
+            date_str = _cell(row, date_i).strip()
             if not date_str:
                 continue
 
             # Фильтр по периоду
-            if not date_str.startswith(target_period):
+            if date_str[:period_len] != target_period:
                 continue
 
-            category_name = row.get("categoryName", "").strip().strip('"')
-            payee = row.get("payee", "").strip().strip('"')
+            category_name = _field(row, category_i)
+            payee = _field(row, payee_i)
 
             # Переводы через Золотую Корону / КоронаПэй — это transfer, не расход
             payee_lower = payee.lower()
             is_korona = "золотая корона" in payee_lower or "koronapay" in payee_lower
-            comment = row.get("comment", "").strip().strip('"')
-            outcome_acc = row.get("outcomeAccountName", "").strip().strip('"')
-            outcome = row.get("outcome", "0").strip().strip('"').replace(",", ".")
-            outcome_curr = row.get("outcomeCurrencyShortTitle", "").strip().strip('"')
-            income_acc = row.get("incomeAccountName", "").strip().strip('"')
-            income = row.get("income", "0").strip().strip('"').replace(",", ".")
-            income_curr = row.get("incomeCurrencyShortTitle", "").strip().strip('"')
+            comment = _field(row, comment_i)
+            outcome_acc = _field(row, outcome_acc_i)
+            outcome = _field(row, outcome_i, "0").replace(",", ".")
+            outcome_curr = _field(row, outcome_curr_i)
+            income_acc = _field(row, income_acc_i)
+            income = _field(row, income_i, "0").replace(",", ".")
+            income_curr = _field(row, income_curr_i)
 
             try:
                 outcome_val = float(outcome) if outcome else 0
@@ -246,11 +342,12 @@ def parse_zen(filepath, categories, target_period):
             except ValueError:
                 continue
 
-            # Дедупликация: пропускаем строки с идентичными ключевыми полями
-            dedup_key = (date_str, payee, outcome, income, outcome_acc, income_acc)
-            if dedup_key in seen:
+            # Дедупликация: пропускаем строки с идентичными ключевыми полями (суммы — уже числами).
+            # Один add вместо in + add: ключ хэшируется один раз, дубль — если размер не вырос
+            seen_before = len(seen)
+            seen.add((date_str, payee, outcome_val, income_val, outcome_acc, income_acc))
+            if len(seen) == seen_before:
                 continue
-            seen.add(dedup_key)
 
             description = payee or comment or category_name or ""
             # Обрезать длинные описания от банков
@@ -338,34 +435,44 @@ def parse_paypal(filepath, categories, target_period):
     - Считает Net (сумму после комиссии PayPal) как сумму операции
     """
     rows = []
-    sub_map = categories["paypal"]["subscriptions"]
-    merchant_map = categories["paypal"].get("merchants", {})
-    types_ignore = set(categories["paypal"]["types_conversion"] + categories["paypal"]["types_ignore"])
+    period_len = len(target_period)
+    pp_cat = categories["paypal"]
+    # Паттерны в нижнем регистре и игнорируемые типы — один раз на загруженные категории
+    sub_map = _derived(pp_cat, "_sub_matcher", lambda c: _pattern_matcher(
+        [(k.lower(), v) for k, v in c["subscriptions"].items()]))
+    merchant_map = _derived(pp_cat, "_merchant_matcher", lambda c: _pattern_matcher(
+        [(k.lower(), v) for k, v in c.get("merchants", {}).items()]))
+    types_ignore = _derived(pp_cat, "_types_ignore", lambda c: frozenset(
+        c["types_conversion"] + c["types_ignore"]))
 
     with _open_source(filepath, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        col = _header_index(reader)
         # Автодетект формата: "Type" (2026 EU) vs "Description" (2025 US)
-        fields = reader.fieldnames or []
-        is_eu_format = "Type" in fields and "Description" not in fields
-        type_col = "Type" if is_eu_format else "Description"
-        date_fmt = "%d/%m/%Y" if is_eu_format else "%m/%d/%Y"
+        is_eu_format = "Type" in col and "Description" not in col
+        type_i = col.get("Type" if is_eu_format else "Description")
+        date_i = col.get("Date")
+        currency_i = col.get("Currency")
+        net_i = col.get("Net")
+        name_i = col.get("Name")
+        tx_id_i = col.get("Transaction ID")
+        date_fmt, alt_fmt = ("%d/%m/%Y", "%m/%d/%Y") if is_eu_format else ("%m/%d/%Y", "%d/%m/%Y")
 
         for row in reader:
-            description = row.get(type_col, "").strip().strip('"')
+            description = _field(row, type_i)
 
             # Пропускаем конвертации и холды
             if description in types_ignore:
                 continue
 
             # Парсим дату
-            date_raw = row.get("Date", "").strip().strip('"')
+            date_raw = _field(row, date_i)
             if not date_raw:
                 continue
             try:
                 dt = datetime.strptime(date_raw, date_fmt)
             except ValueError:
                 # Fallback: пробуем альтернативный формат
-                alt_fmt = "%m/%d/%Y" if is_eu_format else "%d/%m/%Y"
                 try:
                     dt = datetime.strptime(date_raw, alt_fmt)
                 except ValueError:
@@ -373,19 +480,19 @@ def parse_paypal(filepath, categories, target_period):
             date_str = dt.strftime("%Y-%m-%d")
 
             # Фильтр по периоду
-            if not date_str.startswith(target_period):
+            if date_str[:period_len] != target_period:
                 continue
 
-            currency = row.get("Currency", "").strip().strip('"')
+            currency = _field(row, currency_i)
             # Net = сумма после комиссии PayPal (реальное изменение баланса), не Gross.
             # gross_str/gross ниже фактически хранят Net.
-            gross_str = row.get("Net", "0").strip().strip('"')
+            gross_str = _field(row, net_i, "0")
             # Поддержка EU формата: "-8,00" → "-8.00"
             if "." not in gross_str and "," in gross_str:
                 gross_str = gross_str.replace(",", ".")
             else:
                 gross_str = gross_str.replace(",", "")
-            name = row.get("Name", "").strip().strip('"')
+            name = _field(row, name_i)
 
             try:
                 gross = float(gross_str)
@@ -413,19 +520,11 @@ def parse_paypal(filepath, categories, target_period):
 
                 # 1. Подписки (по description type + имени)
                 if description in ("Subscription Payment", "PreApproved Payment Bill User Payment"):
-                    for sub_name, sub_cat in sub_map.items():
-                        if sub_name.lower() in name_lower:
-                            cat = sub_cat
-                            break
-                    else:
-                        cat = "subscriptions"
+                    cat = _match_category(sub_map, name_lower) or "subscriptions"
 
                 # 2. Мерчанты (по имени получателя)
                 if cat == "other_expense" or cat == "subscriptions":
-                    for merchant_name, merchant_cat in merchant_map.items():
-                        if merchant_name.lower() in name_lower:
-                            cat = merchant_cat
-                            break
+                    cat = _match_category(merchant_map, name_lower) or cat
 
                 # 3. Fallback по типу описания
                 if cat == "other_expense":
@@ -436,7 +535,7 @@ def parse_paypal(filepath, categories, target_period):
             if cat not in ("other_expense", "other_income"):
                 desc = strip_surname(desc)
 
-            tx_id = row.get("Transaction ID", "").strip().strip('"')
+            tx_id = _field(row, tx_id_i)
             rows.append({
                 "date": date_str,
                 "type": tx_type,
@@ -463,28 +562,38 @@ def parse_credo_sms(filepath, categories, target_period):
     - PayPal-операции из SMS пропускаются (PayPal CSV точнее)
     """
     rows = []
+    period_len = len(target_period)
     paypal_skipped = 0
     sms_cat = categories.get("credo_sms", {})
-    merchant_map = sms_cat.get("merchants", {})
+    # Паттерны мерчантов в верхнем регистре — один раз на загруженные категории
+    merchant_map = _derived(sms_cat, "_merchant_matcher", lambda c: _pattern_matcher(
+        [(k.upper(), v) for k, v in c.get("merchants", {}).items()]))
     type_map = sms_cat.get("type_mapping", {})
     card_override = sms_cat.get("card_override", {})
 
     with _open_source(filepath, encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
+        col = _header_index(reader)
+        date_i = col.get("date")
+        type_i = col.get("type")
+        amount_i = col.get("amount")
+        currency_i = col.get("currency")
+        merchant_i = col.get("merchant")
+        card_i = col.get("card")
         for row in reader:
-            date_str = row.get("date", "").strip()
+            date_str = _cell(row, date_i).strip()
             if not date_str:
                 continue
 
             # Фильтр по периоду
-            if not date_str.startswith(target_period):
+            if date_str[:period_len] != target_period:
                 continue
 
-            sms_type = row.get("type", "").strip()
-            amount_str = row.get("amount", "0").strip()
-            currency = row.get("currency", "").strip()
-            merchant = row.get("merchant", "").strip()
-            card = row.get("card", "").strip()
+            sms_type = _cell(row, type_i).strip()
+            amount_str = _cell(row, amount_i, "0").strip()
+            currency = _cell(row, currency_i).strip()
+            merchant = _cell(row, merchant_i).strip()
+            card = _cell(row, card_i).strip()
 
             try:
                 amount = float(amount_str)
@@ -517,11 +626,7 @@ def parse_credo_sms(filepath, categories, target_period):
 
             # Мерчант-override (перебивает дефолт по типу)
             if unified_type != "transfer":
-                merchant_upper = merchant.upper()
-                for pattern, cat in merchant_map.items():
-                    if pattern.upper() in merchant_upper:
-                        category = cat
-                        break
+                category = _match_category(merchant_map, merchant.upper()) or category
 
             # Переопределение по карте (например, детская карта)
             if card in card_override and unified_type == "expense":
@@ -568,10 +673,8 @@ def parse_wolt(filepath, categories, period):
     """
     wolt_map = categories.get("wolt", {})
 
-    if len(period) == 7:
-        period_month = period
-    else:
-        period_month = None
+    # YYYY-MM или YYYY: фильтр по дате — сравнение префикса той же длины
+    period_len = len(period)
 
     rows = []
     skipped_service = 0
@@ -585,12 +688,7 @@ def parse_wolt(filepath, categories, period):
             vendor, date_str, total_str, currency, _, _, month_str, year_str, wolt_cat = row[:9]
             wolt_cat = wolt_cat.strip()
 
-            if period_month and not date_str.startswith(period_month[:7]):
-                if period_month[:4] != date_str[:4]:
-                    continue
-                if period_month != date_str[:7]:
-                    continue
-            if not period_month and date_str[:4] != period:
+            if date_str[:period_len] != period:
                 continue
 
             if wolt_cat in ("Сервис Wolt", "Подписка Wolt+"):
@@ -629,6 +727,10 @@ def parse_wolt(filepath, categories, period):
 # ПОИСК ФАЙЛОВ
 # =============================================================================
 
+# Дата в имени Zen-экспорта: zen_YYYY-MM-DD_*.csv
+_ZEN_DATE_RE = re.compile(r'zen_(\d{4}-\d{2}-\d{2})')
+
+
 def find_raw_files(year):
     """Ищет raw файлы для указанного года."""
     year_dir = RAW_DIR / str(year)
@@ -637,28 +739,32 @@ def find_raw_files(year):
         return {}
 
     files = {}
-    zen_candidates = []
-    for f in year_dir.iterdir():
-        name = f.name.lower()
-        if name.startswith("zen") and name.endswith(".csv"):
-            # Пропускаем zen_full_dump (не месячный дамп) и битые симлинки
-            if "full_dump" in name or not f.exists():
+    zen_candidates = []  # (DirEntry, Path)
+    # scandir: имя и stat берутся из DirEntry, без отдельного Path.stat() на файл
+    with os.scandir(year_dir) as it:
+        for entry in it:
+            name = entry.name.lower()
+            if not name.endswith(".csv"):
                 continue
-            zen_candidates.append(f)
-        elif (name.startswith("pp") or name.startswith("paypal") or name.startswith("download")) and name.endswith(".csv"):
-            files.setdefault("paypal_files", []).append(f)
-        elif name.startswith("credo_sms") and name.endswith(".csv"):
-            files["credo_sms"] = f
-        elif name.startswith("wolt") and name.endswith(".csv"):
-            files["wolt"] = f
+            if name.startswith("zen"):
+                # Пропускаем zen_full_dump (не месячный дамп) и битые симлинки
+                if "full_dump" in name or not entry.is_file():
+                    continue
+                zen_candidates.append((entry, Path(entry.path)))
+            elif name.startswith(("pp", "paypal", "download")):
+                files.setdefault("paypal_files", []).append(Path(entry.path))
+            elif name.startswith("credo_sms"):
+                files["credo_sms"] = Path(entry.path)
+            elif name.startswith("wolt"):
+                files["wolt"] = Path(entry.path)
 
     # Если несколько zen файлов — берём последний по дате в имени (zen_YYYY-MM-DD_*) или по mtime
     if zen_candidates:
-        import re as _re
-        def _zen_key(f):
-            m = _re.search(r'zen_(\d{4}-\d{2}-\d{2})', f.name)
-            return (1, m.group(1)) if m else (0, str(f.stat().st_mtime))
-        files["zen"] = sorted(zen_candidates, key=_zen_key)[-1]
+        def _zen_key(candidate):
+            entry, _ = candidate
+            m = _ZEN_DATE_RE.search(entry.name)
+            return (1, m.group(1)) if m else (0, entry.stat().st_mtime)
+        files["zen"] = sorted(zen_candidates, key=_zen_key)[-1][1]
         if len(zen_candidates) > 1:
             print(f"  [zen] найдено {len(zen_candidates)} файлов, используется: {files['zen'].name}")
 
@@ -685,21 +791,14 @@ def generate_monthly_summary(rows, period, categories):
     transfer_rows = [r for r in rows if r["type"] == "transfer"]
 
     # Суммы по категориям
-    income_by_cat = defaultdict(float)
-    for r in income_rows:
-        income_by_cat[r["category"]] += r["amount_rub"]
-
-    expense_by_cat = defaultdict(float)
-    for r in expense_rows:
-        expense_by_cat[r["category"]] += r["amount_rub"]
+    income_by_cat = _rub_totals(income_rows, itemgetter("category"))
+    expense_by_cat = _rub_totals(expense_rows, itemgetter("category"))
 
     # Суммы по источникам
-    expense_by_source = defaultdict(float)
-    for r in expense_rows:
-        expense_by_source[r["source"]] += r["amount_rub"]
+    expense_by_source = _rub_totals(expense_rows, itemgetter("source"))
 
-    total_income = sum(income_by_cat.values())
-    total_expense = sum(expense_by_cat.values())
+    total_income = math.fsum(r["amount_rub"] for r in income_rows)
+    total_expense = math.fsum(r["amount_rub"] for r in expense_rows)
     balance = total_income - total_expense
 
     # Определяем название месяца
@@ -806,43 +905,42 @@ def generate_yearly_summary(rows, year, categories):
     lines.append("| Месяц | Доходы | Расходы | Баланс |")
     lines.append("|-------|--------|---------|--------|")
 
-    total_inc_year = 0
-    total_exp_year = 0
+    month_incs = []
+    month_exps = []
 
     for m in range(1, 13):
         key = f"{year}-{m:02d}"
         month_rows = months_data.get(key, [])
         if not month_rows:
             continue
-        inc = sum(r["amount_rub"] for r in month_rows if r["type"] == "income")
-        exp = sum(r["amount_rub"] for r in month_rows if r["type"] == "expense")
+        inc = math.fsum(r["amount_rub"] for r in month_rows if r["type"] == "income")
+        exp = math.fsum(r["amount_rub"] for r in month_rows if r["type"] == "expense")
         bal = inc - exp
         sign = "+" if bal >= 0 else ""
-        total_inc_year += inc
-        total_exp_year += exp
+        month_incs.append(inc)
+        month_exps.append(exp)
         lines.append(f"| {RU_MONTHS[m]} | {inc:,.0f} | {exp:,.0f} | {sign}{bal:,.0f} |")
 
+    total_inc_year = math.fsum(month_incs)
+    total_exp_year = math.fsum(month_exps)
     bal_year = total_inc_year - total_exp_year
     sign_y = "+" if bal_year >= 0 else ""
     lines.append(f"| **Итого** | **{total_inc_year:,.0f}** | **{total_exp_year:,.0f}** | **{sign_y}{bal_year:,.0f}** |")
-    avg_inc = sum(r["amount_rub"] for r in complete_rows if r["type"] == "income") / n_months
-    avg_exp = sum(r["amount_rub"] for r in complete_rows if r["type"] == "expense") / n_months
+    avg_inc = math.fsum(r["amount_rub"] for r in complete_rows if r["type"] == "income") / n_months
+    avg_exp = math.fsum(r["amount_rub"] for r in complete_rows if r["type"] == "expense") / n_months
     lines.append(f"| *Среднее/мес ({n_months} полн. мес)* | *{avg_inc:,.0f}* | *{avg_exp:,.0f}* | |")
     lines.append("")
 
     # Расходы по категориям за год
     expense_rows = [r for r in rows if r["type"] == "expense"]
-    expense_by_cat = defaultdict(float)
-    for r in expense_rows:
-        expense_by_cat[r["category"]] += r["amount_rub"]
+    expense_by_cat = _rub_totals(expense_rows, itemgetter("category"))
 
-    total_exp = sum(expense_by_cat.values())
+    total_exp = math.fsum(r["amount_rub"] for r in expense_rows)
 
     # Суммы по полным месяцам — для колонки «Среднее/мес»
-    expense_by_cat_avg = defaultdict(float)
-    for r in complete_rows:
-        if r["type"] == "expense":
-            expense_by_cat_avg[r["category"]] += r["amount_rub"]
+    expense_by_cat_avg = _rub_totals(
+        (r for r in complete_rows if r["type"] == "expense"), itemgetter("category"),
+    )
 
     lines.append("## Расходы по категориям (год)")
     lines.append("")
@@ -856,14 +954,11 @@ def generate_yearly_summary(rows, year, categories):
 
     # Доходы по категориям
     income_rows = [r for r in rows if r["type"] == "income"]
-    income_by_cat = defaultdict(float)
-    for r in income_rows:
-        income_by_cat[r["category"]] += r["amount_rub"]
+    income_by_cat = _rub_totals(income_rows, itemgetter("category"))
 
-    income_by_cat_avg = defaultdict(float)
-    for r in complete_rows:
-        if r["type"] == "income":
-            income_by_cat_avg[r["category"]] += r["amount_rub"]
+    income_by_cat_avg = _rub_totals(
+        (r for r in complete_rows if r["type"] == "income"), itemgetter("category"),
+    )
 
     lines.append("## Доходы по категориям (год)")
     lines.append("")
@@ -943,20 +1038,15 @@ def write_findoc_pie_csv(rows, filepath, display_names):
     Отдельные файлы для расходов и доходов не нужны —
     findoc модель фильтрует по Category.
     """
-    from collections import defaultdict
-
     # Агрегируем по (тип, подкатегория)
-    totals = defaultdict(float)
-    first_date = None
-    for r in rows:
-        if r["type"] not in ("income", "expense"):
-            continue
-        if r["category"] == "transfer":
-            continue
-        cat_display = display_names.get(r["category"], r["category"])
-        totals[(r["type"], cat_display)] += r["amount_rub"]
-        if first_date is None or r["date"] < first_date:
-            first_date = r["date"]
+    pie_rows = [
+        r for r in rows
+        if r["type"] in ("income", "expense") and r["category"] != "transfer"
+    ]
+    totals = _rub_totals(
+        pie_rows, lambda r: (r["type"], display_names.get(r["category"], r["category"])),
+    )
+    first_date = min((r["date"] for r in pie_rows), default=None)
 
     if first_date is None:
         first_date = "2026-01-01"
@@ -1096,8 +1186,8 @@ def main():
     print(f"\nВсего: {len(all_rows)} транзакций")
 
     # Статистика
-    income_total = sum(r["amount_rub"] for r in all_rows if r["type"] == "income")
-    expense_total = sum(r["amount_rub"] for r in all_rows if r["type"] == "expense")
+    income_total = math.fsum(r["amount_rub"] for r in all_rows if r["type"] == "income")
+    expense_total = math.fsum(r["amount_rub"] for r in all_rows if r["type"] == "expense")
     transfer_count = sum(1 for r in all_rows if r["type"] == "transfer")
     print(f"Доходы: {income_total:,.0f} R")
     print(f"Расходы: {expense_total:,.0f} R")
@@ -10,6 +10,7 @@ import json
 import re
 import base64
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 from github import Github
 from google.oauth2.credentials import Credentials
@@ -70,6 +71,22 @@ def load_file(filepath: str, default: str = "") -> str:
     return default
 
 
+def load_file_cached(filepath: str, default: str = "") -> str:
+    """load_file с кэшем до изменения файла: на вызов — только stat(), чтение — когда сменился mtime."""
+    try:
+        mtime = os.stat(filepath).st_mtime_ns
+    except OSError:
+        return default
+    return _read_file_at(filepath, mtime)
+
+
+@lru_cache(maxsize=8)
+def _read_file_at(filepath: str, mtime: int) -> str:
+    # mtime — часть ключа кэша: изменённый файл читается заново
+    with open(filepath, "r", encoding="utf-8") as f:
+        return f.read()
+
+
 def get_github_file(filepath: str) -> str:
     """Получить файл из GitHub."""
     if not GITHUB_TOKEN:
@@ -293,14 +310,17 @@ def get_family_chat_id(username: str) -> int | None:
 
 # === REMINDERS ===
 
-def get_reminders() -> list:
-    """Получить напоминания из GitHub."""
+def get_reminders(chat_id: int = None) -> list:
+    """Получить напоминания из GitHub (только для chat_id, если указан)."""
     content = get_github_file(REMINDERS_FILE)
     if content and content != "Файл не найден.":
         try:
-            return json.loads(content)
+            reminders = json.loads(content)
         except:
-            pass
+            return []
+        if chat_id is not None:
+            return [r for r in reminders if r.get("chat_id") == chat_id]
+        return reminders
     return []
 
 
@@ -316,6 +336,7 @@ def add_reminder(chat_id: int, remind_at: datetime, text: str, from_user: str =
     reminder = {
         "chat_id": chat_id,
         "remind_at": remind_at.isoformat(),
+        "remind_at_ts": int(remind_at.timestamp()),
         "text": text,
         "created_at": datetime.now(TZ).isoformat(),
     }
@@ -327,6 +348,14 @@ def add_reminder(chat_id: int, remind_at: datetime, text: str, from_user: str =
     return save_reminders(reminders)
 
 
+def reminder_timestamp(reminder: dict) -> int:
+    """Время напоминания в epoch-секундах. Старые записи без remind_at_ts парсятся из ISO."""
+    ts = reminder.get("remind_at_ts")
+    if ts is None:
+        ts = int(datetime.fromisoformat(reminder["remind_at"]).timestamp())
+    return ts
+
+
 def _next_recurring(remind_at: datetime, recurring: str) -> datetime:
     """Calculate next occurrence for a recurring reminder."""
     if recurring == "daily":
@@ -344,19 +373,20 @@ def _next_recurring(remind_at: datetime, recurring: str) -> datetime:
 def get_due_reminders() -> list:
     """Получить напоминания, которые пора отправить. Recurring пересоздаются."""
     reminders = get_reminders()
-    now = datetime.now(TZ)
+    now_ts = datetime.now(TZ).timestamp()
     due = []
     remaining = []
 
     for r in reminders:
-        remind_at = datetime.fromisoformat(r["remind_at"])
-        if remind_at <= now:
+        if reminder_timestamp(r) <= now_ts:
             due.append(r)
             # Reschedule recurring reminders
             recurring = r.get("recurring")
             if recurring:
+                next_at = _next_recurring(datetime.fromisoformat(r["remind_at"]), recurring)
                 next_r = dict(r)
-                next_r["remind_at"] = _next_recurring(remind_at, recurring).isoformat()
+                next_r["remind_at"] = next_at.isoformat()
+                next_r["remind_at_ts"] = int(next_at.timestamp())
                 remaining.append(next_r)
         else:
             remaining.append(r)
@@ -3,6 +3,7 @@ import random
 import time
 import hashlib
 from datetime import datetime, timedelta
+from functools import lru_cache
 from config import ZONE_EMOJI, PROJECT_EMOJI, PROJECT_HEADERS, ALL_DESTINATIONS, TZ, logger
 from storage import get_writing_file, save_writing_file
 
@@ -57,7 +58,11 @@ def get_life_tasks() -> str:
 
 def get_today_tasks() -> list:
     """Получить открытые задачи из секции ## Сегодня."""
-    content = get_life_tasks()
+    return _parse_today_tasks(get_life_tasks())
+
+
+def _parse_today_tasks(content: str) -> list:
+    """Открытые задачи секции ## Сегодня из текста tasks.md."""
     in_section = False
     tasks = []
     for line in content.split('\n'):
@@ -350,13 +355,15 @@ def save_quote(quote_text: str, source_name: str = "unknown") -> bool:
     return result
 
 
+# Паттерн: [SAVE:task:зона:текст] или [SAVE:note:заголовок:текст]
+_SAVE_TAG_RE = re.compile(r'\[SAVE:(task|note):([^:]+):([^\]]+)\]')
+
+
 def parse_save_tag(response: str) -> tuple:
     """Извлечь тег SAVE из ответа.
     Возвращает (clean_response, save_type, zone_or_title, content) или (response, None, None, None)
     """
-    # Паттерн: [SAVE:task:зона:текст] или [SAVE:note:заголовок:текст]
-    pattern = r'\[SAVE:(task|note):([^:]+):([^\]]+)\]'
-    match = re.search(pattern, response)
+    match = _SAVE_TAG_RE.search(response)
 
     if match:
         save_type = match.group(1)  # task или note
@@ -368,6 +375,10 @@ def parse_save_tag(response: str) -> tuple:
     return (response, None, None, None)
 
 
+# Таблица для str.translate: убрать маркеры приоритета при показе задачи
+_PRIO_STRIP = str.maketrans("", "", "⏫🔺🔼")
+
+
 def _task_hash(task_text: str) -> str:
     """Короткий хеш задачи для callback data (8 hex chars)."""
     return hashlib.md5(task_text.encode()).hexdigest()[:8]
@@ -429,11 +440,40 @@ def _get_priority_tasks() -> str:
     return "\n\n".join(parts) if parts else "Нет задач с приоритетами."
 
 
+# Категория joy → секции sensory menu, из которых берутся варианты
+_JOY_MENU_KEYS = {
+    "sensory": ("inputs", "emergency", "unfreeze"),  # Combine all sensory
+    "creativity": ("creativity",),
+    "media": ("media",),
+    "connection": ("connection",),
+}
+
+
 def _parse_sensory_menu() -> dict:
     """Parse sensory menu from tasks.md.
     Returns dict with keys: emergency (🔴), unfreeze (🟡), inputs (🟢), creativity, media, connection
+
+    Разбор кэшируется по содержимому tasks.md — результат общий, не мутировать.
     """
-    content = get_life_tasks()
+    return _parse_sensory_menu_content(get_life_tasks() or "")
+
+
+def get_joy_items(category: str) -> list:
+    """Варианты из sensory menu для категории joy (общий список — не мутировать)."""
+    return _joy_items_by_category(get_life_tasks() or "").get(category, [])
+
+
+@lru_cache(maxsize=1)
+def _joy_items_by_category(content: str) -> dict:
+    menu = _parse_sensory_menu_content(content)
+    return {
+        cat: [item for key in keys for item in menu.get(key, [])]
+        for cat, keys in _JOY_MENU_KEYS.items()
+    }
+
+
+@lru_cache(maxsize=1)
+def _parse_sensory_menu_content(content: str) -> dict:
     if not content:
         return {}
 
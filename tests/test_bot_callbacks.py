@@ -0,0 +1,48 @@
+"""Тесты диспетчера кнопок bot.button_callback."""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+bot = pytest.importorskip("bot")
+
+
+def _morning_update(chat_id=42, feeling="ok"):
+    query = SimpleNamespace(
+        data=f"morning_{feeling}",
+        message=SimpleNamespace(chat=SimpleNamespace(id=chat_id), chat_id=chat_id),
+        answer=AsyncMock(),
+        edit_message_reply_markup=AsyncMock(),
+    )
+    update = SimpleNamespace(callback_query=query)
+    context = SimpleNamespace(
+        bot_data={}, user_data={},
+        bot=SimpleNamespace(send_message=AsyncMock()),
+    )
+    return update, context
+
+
+def test_morning_callback_refetches_whoop_data(monkeypatch):
+    """Нет данных ни в bot_data, ни в файловом кэше → WHOOP запрашивается заново."""
+    whoop_data = {"sleep_hours": 7.5, "strain": 8.0, "recovery": 72, "data_str": "Recovery: 72%"}
+    fetch = MagicMock(return_value=whoop_data)
+    llm = AsyncMock(return_value="x" * 300)
+    motivations = MagicMock(return_value="- ok")
+    monkeypatch.setattr(bot, "load_morning_cache", lambda chat_id: {})
+    monkeypatch.setattr(bot, "get_morning_whoop_data", fetch)
+    monkeypatch.setattr(bot, "get_llm_response", llm)
+    monkeypatch.setattr(bot, "get_motivations_for_mode", motivations)
+
+    update, context = _morning_update()
+    asyncio.run(bot.button_callback(update, context))
+
+    fetch.assert_called_once_with()
+    motivations.assert_called_once_with("normal", 7.5, 8.0, 72)
+    assert "Recovery: 72%" in llm.call_args.args[0]
+    context.bot.send_message.assert_awaited_once_with(chat_id=42, text="x" * 300)
@@ -0,0 +1,33 @@
+"""Тесты разбора списка задач в handlers (add_mode)."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+handlers = pytest.importorskip("handlers")
+
+
+def _task(line):
+    m = handlers._BULLET_RE.match(line)
+    return m.group(1) if m else None
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("- buy milk", "buy milk"),
+    ("* call mom  ", "call mom"),
+    ("• read", "read"),
+    ("1. pay rent", "pay rent"),
+    ("10) fix bike", "fix bike"),
+    ("  2. 3 eggs", "3 eggs"),
+    ("3 apples", "3 apples"),
+])
+def test_bullet_re_strips_markers(line, expected):
+    assert _task(line) == expected
+
+
+@pytest.mark.parametrize("line", ["", "   ", "-", "  • ", "1.", "2)", "- 1.", "* - "])
+def test_bullet_re_skips_marker_only_lines(line):
+    assert _task(line) is None
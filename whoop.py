@@ -6,7 +6,10 @@ Handles token refresh, recovery, sleep, body measurements.
 import os
 import json
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
+from functools import wraps
 from zoneinfo import ZoneInfo
 
 import requests
@@ -20,6 +23,61 @@ TOKEN_URL = "https://api.prod.whoop.com/oauth/oauth2/token"
 # GitHub storage for tokens (same pattern as bot.py)
 WHOOP_TOKENS_FILE = "whoop_tokens.json"
 
+# Response cache TTLs (seconds): jobs and commands that run close together
+# (morning job → log_whoop_data, /whoop → background log) share one fetch
+DAY_CACHE_TTL = 300
+WEEK_CACHE_TTL = 7200
+
+
+def _ttl_cached(ttl: int):
+    """Cache a no-arg WhoopClient getter for ttl seconds, keyed by method + local date."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(self):
+            key = (fn.__name__, datetime.now(TZ).date())
+            return self._cached(key, ttl, lambda: fn(self))
+        return wrapper
+    return decorator
+
+
+def compute_recovery_summary(records: list) -> dict:
+    """Weekly recovery stats from WHOOP recovery records in a single pass.
+
+    Returns HRV / RHR / recovery averages (None when there is no data) and the
+    number of days in the green (>= 67) / yellow (>= 34) / red recovery zones.
+    """
+    hrv_sum = rhr_sum = rec_sum = 0
+    hrv_n = rhr_n = rec_n = 0
+    green = yellow = red = 0
+    for r in records:
+        score = r.get("score") or {}
+        v = score.get("hrv_rmssd_milli")
+        if v is not None:
+            hrv_sum += v
+            hrv_n += 1
+        v = score.get("resting_heart_rate")
+        if v is not None:
+            rhr_sum += v
+            rhr_n += 1
+        v = score.get("recovery_score")
+        if v is not None:
+            rec_sum += v
+            rec_n += 1
+            if v >= 67:
+                green += 1
+            elif v >= 34:
+                yellow += 1
+            else:
+                red += 1
+    return {
+        "hrv_avg": hrv_sum / hrv_n if hrv_n else None,
+        "rhr_avg": rhr_sum / rhr_n if rhr_n else None,
+        "recovery_avg": rec_sum / rec_n if rec_n else None,
+        "green": green,
+        "yellow": yellow,
+        "red": red,
+    }
+
 
 class WhoopClient:
     def __init__(self):
@@ -30,6 +88,10 @@ class WhoopClient:
         self._github_token = os.getenv("GITHUB_TOKEN")
         self._github_repo = os.getenv("GITHUB_REPO", "heebie7/geek-bot")
         self._tokens_loaded_at = None
+        self._auth_lock = threading.Lock()
+        self._cache = {}  # (method, date) -> (expires_at monotonic, value)
+        self._cache_lock = threading.Lock()
+        self._key_locks = {}  # per-key locks: concurrent callers wait for one fetch
 
     def _headers(self):
         return {
@@ -112,20 +174,28 @@ class WhoopClient:
             return None
 
         url = f"{BASE_URL}{endpoint}"
+        token_used = self.access_token
         resp = requests.get(url, headers=self._headers(), params=params)
 
         if resp.status_code == 401:
-            # Token expired — force reload from GitHub, then retry
-            self._tokens_loaded_at = None
-            self._load_tokens_from_github()
-            resp = requests.get(url, headers=self._headers(), params=params)
-
-            if resp.status_code == 401:
-                # Still expired — do a full refresh
-                if self._refresh_tokens():
+            # Endpoints are fetched from several threads at once — only one of
+            # them may reload/refresh tokens (refresh token is single-use).
+            with self._auth_lock:
+                if self.access_token != token_used:
+                    # Another thread has already renewed the token
                     resp = requests.get(url, headers=self._headers(), params=params)
                 else:
-                    return None
+                    # Token expired — force reload from GitHub, then retry
+                    self._tokens_loaded_at = None
+                    self._load_tokens_from_github()
+                    resp = requests.get(url, headers=self._headers(), params=params)
+
+                    if resp.status_code == 401:
+                        # Still expired — do a full refresh
+                        if self._refresh_tokens():
+                            resp = requests.get(url, headers=self._headers(), params=params)
+                        else:
+                            return None
 
         if resp.status_code != 200:
             logger.error(f"WHOOP API error {resp.status_code}: {resp.text}")
@@ -133,8 +203,28 @@ class WhoopClient:
 
         return resp.json()
 
+    def _cached(self, key, ttl: int, fetch):
+        """Return cached value for key or call fetch(). Empty results (API errors) are not cached."""
+        with self._cache_lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            now = time.monotonic()
+            hit = self._cache.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+            value = fetch()
+            if value:
+                with self._cache_lock:
+                    # Drop expired entries (previous days) so the dict stays small
+                    for k in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+                        del self._cache[k]
+                        self._key_locks.pop(k, None)
+                    self._cache[key] = (now + ttl, value)
+            return value
+
     # === Public API methods ===
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_recovery_today(self) -> dict | None:
         """Get today's recovery data."""
         now = datetime.now(TZ)
@@ -147,6 +237,7 @@ class WhoopClient:
             return data["records"][0]
         return None
 
+    @_ttl_cached(WEEK_CACHE_TTL)
     def get_recovery_week(self) -> list:
         """Get last 7 days of recovery."""
         now = datetime.now(TZ)
@@ -159,6 +250,7 @@ class WhoopClient:
             return data["records"]
         return []
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_sleep_today(self) -> dict | None:
         """Get last night's primary sleep (not naps)."""
         now = datetime.now(TZ)
@@ -187,6 +279,7 @@ class WhoopClient:
             return data["records"][0]
         return None
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_cycle_today(self) -> dict | None:
         """Get today's cycle (day strain)."""
         now = datetime.now(TZ)
@@ -199,6 +292,7 @@ class WhoopClient:
             return data["records"][0]
         return None
 
+    @_ttl_cached(WEEK_CACHE_TTL)
     def get_cycles_week(self) -> list:
         """Get last 7 days of cycles (strain data)."""
         now = datetime.now(TZ)
@@ -211,6 +305,7 @@ class WhoopClient:
             return data["records"]
         return []
 
+    @_ttl_cached(WEEK_CACHE_TTL)
     def get_sleep_week(self) -> list:
         """Get last 7 days of primary sleep (not naps)."""
         now = datetime.now(TZ)
@@ -223,6 +318,7 @@ class WhoopClient:
             return [r for r in data["records"] if not r.get("nap", False)]
         return []
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_cycle_yesterday(self) -> dict | None:
         """Get yesterday's cycle (strain). Use this for morning reports instead of today."""
         now = datetime.now(TZ)
@@ -237,6 +333,7 @@ class WhoopClient:
             return data["records"][0]
         return None
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_recovery_yesterday(self) -> dict | None:
         """Get yesterday's recovery (the score that was 'today' yesterday morning)."""
         now = datetime.now(TZ)
@@ -251,6 +348,7 @@ class WhoopClient:
             return data["records"][0]
         return None
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_sleep_yesterday(self) -> dict | None:
         """Get the primary sleep that ended yesterday morning (i.e. night before yesterday → yesterday)."""
         now = datetime.now(TZ)
@@ -280,6 +378,7 @@ class WhoopClient:
                 continue
         return None
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_recovery_3_days(self) -> list:
         """Get last 3 days of recovery for trend analysis."""
         now = datetime.now(TZ)
@@ -336,6 +435,7 @@ class WhoopClient:
             "current": current
         }
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_workouts_today(self) -> list:
         """Get today's workouts."""
         now = datetime.now(TZ)
@@ -348,6 +448,7 @@ class WhoopClient:
             return data["records"]
         return []
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_workouts_yesterday(self) -> list:
         """Get yesterday's workouts."""
         now = datetime.now(TZ)
@@ -362,6 +463,7 @@ class WhoopClient:
             return data["records"]
         return []
 
+    @_ttl_cached(WEEK_CACHE_TTL)
     def get_workouts_week(self) -> list:
         """Get last 7 days of workouts."""
         now = datetime.now(TZ)
@@ -374,6 +476,7 @@ class WhoopClient:
             return data["records"]
         return []
 
+    @_ttl_cached(DAY_CACHE_TTL)
     def get_body_measurement(self) -> dict | None:
         """Get latest body measurement."""
         data = self._api_get("/v2/user/measurement/body")
@@ -400,9 +503,10 @@ class WhoopClient:
 
     # === Formatted output ===
 
-    def format_recovery_today(self) -> str:
-        """Human-readable recovery summary."""
-        rec = self.get_recovery_today()
+    def format_recovery_today(self, rec=None) -> str:
+        """Human-readable recovery summary. rec — already fetched recovery (else fetched here)."""
+        if rec is None:
+            rec = self.get_recovery_today()
         if not rec:
             return "WHOOP: нет данных recovery за сегодня."
 
@@ -433,9 +537,10 @@ class WhoopClient:
 
         return "\n".join(parts)
 
-    def format_sleep_today(self) -> str:
-        """Human-readable sleep summary (actual sleep, not in-bed)."""
-        sleep = self.get_sleep_today()
+    def format_sleep_today(self, sleep=None) -> str:
+        """Human-readable sleep summary (actual sleep, not in-bed). sleep — already fetched record (else fetched here)."""
+        if sleep is None:
+            sleep = self.get_sleep_today()
         if not sleep:
             return "Нет данных сна."
 
@@ -691,36 +796,18 @@ class WhoopClient:
         if not records:
             return "WHOOP: нет данных за неделю."
 
-        scores = []
-        hrvs = []
-        rhrs = []
+        stats = compute_recovery_summary(records)
+        parts = ["WHOOP — неделя"]
 
-        for rec in records:
-            s = rec.get("score", {})
-            if s.get("recovery_score") is not None:
-                scores.append(s["recovery_score"])
-            if s.get("hrv_rmssd_milli") is not None:
-                hrvs.append(s["hrv_rmssd_milli"])
-            if s.get("resting_heart_rate") is not None:
-                rhrs.append(s["resting_heart_rate"])
+        if stats["recovery_avg"] is not None:
+            parts.append(f"Recovery avg: {round(stats['recovery_avg'])}%")
+            parts.append(f"  green: {stats['green']}, yellow: {stats['yellow']}, red: {stats['red']}")
 
-        parts = ["WHOOP — неделя"]
+        if stats["hrv_avg"] is not None:
+            parts.append(f"HRV avg: {round(stats['hrv_avg'], 1)} ms")
 
-        if scores:
-            avg_recovery = round(sum(scores) / len(scores))
-            green_count = sum(1 for s in scores if s >= 67)
-            yellow_count = sum(1 for s in scores if 34 <= s < 67)
-            red_count = sum(1 for s in scores if s < 34)
-            parts.append(f"Recovery avg: {avg_recovery}%")
-            parts.append(f"  green: {green_count}, yellow: {yellow_count}, red: {red_count}")
-
-        if hrvs:
-            avg_hrv = round(sum(hrvs) / len(hrvs), 1)
-            parts.append(f"HRV avg: {avg_hrv} ms")
-
-        if rhrs:
-            avg_rhr = round(sum(rhrs) / len(rhrs))
-            parts.append(f"RHR avg: {avg_rhr} bpm")
+        if stats["rhr_avg"] is not None:
+            parts.append(f"RHR avg: {round(stats['rhr_avg'])} bpm")
 
         # Body measurement
         body = self.get_body_measurement()